@@ -0,0 +1,711 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import re
+import pymysql
+import threading
+import subprocess
+from time import sleep, time
+from shutil import rmtree
+from collections import OrderedDict
+
+from testing.common.database import (
+    Database, DatabaseFactory, SkipIfNotInstalledDecorator, get_path_of
+)
+from testing.mysqld.cache import PersistentCache
+from testing.mysqld.clone import clone_directory, unmount_overlayfs
+from testing.mysqld.schema import IsolatedDatabase, SchemaDropper
+from testing.mysqld.rollback import RollbackSession, create_template
+from testing.mysqld.profiles import (
+    create_tmpfs_directory, get_footprint_settings, get_option_name, get_profile_settings, get_read_only_settings,
+    get_rss
+)
+from testing.mysqld.readiness import BootlogWatcher, probe_mysqld
+from testing.mysqld.parallel import start_many
+from testing.mysqld.discovery import DiscoveryCache
+from testing.mysqld.snapshot import SnapshotManager
+from testing.mysqld.profiling import SLOW_QUERY_LOG_SETTINGS, StatsCollector, Timings, write_report
+from testing.mysqld.connections import ConnectionPool, close_quietly
+from testing.mysqld.tracking import TableResetter
+from testing.mysqld.network import (
+    create_socket_directory, get_socket_path, is_port_conflicted, is_reserved, release_port, reserve_port
+)
+
+__all__ = ['Mysqld', 'MysqldFactory', 'MysqldPool', 'MysqldReplicaSet', 'PersistentCache', 'skipIfNotFound']
+
+SEARCH_PATHS = ['/usr/local/mysql']
+
+# paths of programs and versions of mysqld (shared between processes)
+discovery_cache = DiscoveryCache()
+
+
+class Mysqld(Database):
+    DEFAULT_SETTINGS = dict(auto_start=2,
+                            base_dir=None,
+                            mysql_install_db=None,
+                            mysqld=None,
+                            pid=None,
+                            port=None,
+                            copy_data_from=None,
+                            clone_strategies=None,
+                            profile=None,
+                            footprint=None,
+                            read_only=False,
+                            tmpfs_dir=None,
+                            collect_stats=False,
+                            report_file=None,
+                            on_report=None,
+                            user="root",
+                            passwd=None)
+    subdirectories = ['etc', 'var', 'tmp']
+    MAX_PORT_RETRIES = 3
+
+    @classmethod
+    def start_many(cls, n, max_workers=None, **settings):
+        """Launches ``n`` servers concurrently"""
+        return start_many(cls, n, settings, max_workers)
+
+    @classmethod
+    def astart(cls, **settings):
+        """Returns ``AsyncMysqld``; use as ``async with Mysqld.astart() as mysqld`` (Python 3.5+)"""
+        from testing.mysqld.aio import AsyncMysqld
+        return AsyncMysqld(**settings)
+
+    def initialize(self):
+        self.timings = Timings()
+        self.stats = None
+        self.stats_collector = None
+        self._schema_dropper = None
+        self._admin_connection = None
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._rollback_templates = set()
+        self._table_resetters = {}
+        self._port_retries = self.MAX_PORT_RETRIES
+        self._socket_dir = None
+        self.snapshots = SnapshotManager(self)
+        self.my_cnf = dict(self.settings.get('my_cnf', {}))
+
+        # run over the datadir of copy_data_from directly (shared with other servers)
+        self.read_only = bool(self.settings['read_only'] and self.settings['copy_data_from'])
+        if self.read_only:
+            if self.has_option('log-bin'):
+                raise ValueError("read_only mode can not write binary logs")
+            self.my_cnf['datadir'] = self.settings['copy_data_from']
+
+        # place datadir on tmpfs (only if base_dir is temporary)
+        self._ephemeral_dir = None
+        if self.settings['profile'] and self._use_tmpdir and not self.read_only:
+            self._ephemeral_dir = create_tmpfs_directory(self.settings['tmpfs_dir'],
+                                                         self.settings['copy_data_from'])
+            if self._ephemeral_dir:
+                self.my_cnf.setdefault('datadir', os.path.join(self._ephemeral_dir, 'var'))
+                self.my_cnf.setdefault('tmpdir', os.path.join(self._ephemeral_dir, 'tmp'))
+
+        # keep the path of socket file within the limit of sun_path
+        if 'socket' not in self.my_cnf:
+            socket_path = get_socket_path(self.base_dir)
+            if socket_path is None:
+                self._socket_dir = create_socket_directory()
+                socket_path = os.path.join(self._socket_dir, 'mysql.sock')
+            self.my_cnf['socket'] = socket_path
+
+        self.my_cnf.setdefault('datadir', os.path.join(self.base_dir, 'var'))
+        self.my_cnf.setdefault('pid-file', os.path.join(self.base_dir, 'tmp', 'mysqld.pid'))
+        self.my_cnf.setdefault('tmpdir', os.path.join(self.base_dir, 'tmp'))
+
+        with self.timings.measure('find_program'):
+            self.mysqld = self.settings.get('mysqld')
+            if self.mysqld is None:
+                self.mysqld = find_program('mysqld', ['bin', 'libexec', 'sbin'])
+
+        with self.timings.measure('detect_version'):
+            self.flavor, self.version = detect_server(self.mysqld)
+
+        with self.timings.measure('find_program'):
+            self.mysql_install_db = self.settings.get('mysql_install_db')
+            if self.mysql_install_db is None:
+                try:
+                    self.mysql_install_db = find_program('mysql_install_db', ['bin', 'scripts'])
+                except RuntimeError:
+                    if not self.supports_initialize_insecure():  # not required since MySQL 5.7.6
+                        raise
+
+        if self.read_only:
+            settings = get_read_only_settings(self.flavor, self.version, self.my_cnf['tmpdir'])
+            self.my_cnf.update(settings)
+
+        if self.settings['footprint']:
+            self.merge_my_cnf(get_footprint_settings(self.settings['footprint'], self.flavor, self.version))
+
+        if self.settings['profile']:
+            settings = get_profile_settings(self.settings['profile'], self.flavor, self.version,
+                                            on_tmpfs=bool(self._ephemeral_dir))
+            if self.has_option('log-bin'):
+                settings.pop('skip-log-bin', None)
+            self.merge_my_cnf(settings)
+
+        if self.settings['collect_stats']:
+            self.stats_collector = StatsCollector(self)
+            if not self.read_only:  # slow log table is stored in datadir
+                self.merge_my_cnf(SLOW_QUERY_LOG_SETTINGS)
+
+    def has_option(self, name):
+        """Returns True if my_cnf has the option (spelled with dashes, underscores or ``loose-`` prefix)"""
+        return any(get_option_name(key) == get_option_name(name) for key in self.my_cnf)
+
+    def merge_my_cnf(self, settings):
+        """Adds settings to my_cnf; options already given (in any spelling) are kept as is"""
+        options = set(get_option_name(key) for key in self.my_cnf)
+        for key, value in settings.items():
+            if get_option_name(key) not in options:
+                self.my_cnf[key] = value
+
+    def supports_initialize_insecure(self):
+        return self.flavor == 'mysql' and self.version >= (5, 7, 6)
+
+    def dsn(self, **kwargs):
+        params = dict(kwargs)
+
+        if 'port' in self.my_cnf:
+            params.setdefault('port', self.my_cnf['port'])
+
+        if 'port' in params:
+            if 'bind-address' in self.my_cnf:
+                params.setdefault('host', self.my_cnf['bind-address'])
+            else:
+                params.setdefault('host', '127.0.0.1')
+        else:
+            params.setdefault('unix_socket', self.my_cnf['socket'])
+
+        params.setdefault('user', self.settings.get('user'))
+        passwd = self.settings.get('passwd')
+        if passwd:
+            params.setdefault('passwd', passwd)
+        params.setdefault('db', 'test')
+
+        return params
+
+    def url(self, **kwargs):
+        return build_url(self.dsn(**kwargs))
+
+    def get_data_directory(self):
+        return self.my_cnf['datadir']
+
+    def isolated_database(self, template=None, prefix='test_'):
+        """Creates a uniquely named schema (copying tables of ``template`` schema if given)"""
+        database = IsolatedDatabase(self, template=template, prefix=prefix)
+        database.create()
+        return database
+
+    def rollback_session(self, db='test', template=None, **kwargs):
+        """Opens a connection whose work is rolled back by ``reset()`` and ``close()``.
+
+        If ``template`` is not given, a copy of ``db`` taken at the first call is used
+        to restore the schema after statements causing implicit commits.
+        """
+        if template is None:
+            template = '_pristine_%s' % db
+            if template not in self._rollback_templates:
+                create_template(self, db, template)
+                self._rollback_templates.add(template)
+
+        return RollbackSession(self, db, template, **kwargs)
+
+    def checkpoint(self, db='test', tracking='auto'):
+        """Saves tables of ``db`` to be restored by ``reset_tables()``.
+
+        ``tracking`` is the way to find changed tables; ``statistics`` (table statistics and
+        write counters of performance_schema), ``checksum`` (``CHECKSUM TABLE``) or ``auto``.
+        """
+        resetter = self._table_resetters.get(db)
+        if resetter is None or resetter.tracking != tracking:
+            resetter = self._table_resetters[db] = TableResetter(self, db, tracking=tracking)
+
+        resetter.checkpoint()
+        return resetter
+
+    def reset_tables(self, db='test'):
+        """Restores the tables of ``db`` changed since the checkpoint"""
+        if db not in self._table_resetters:
+            raise RuntimeError("checkpoint of %s is not taken" % db)
+
+        return self._table_resetters[db].reset()
+
+    def snapshot(self, name):
+        """Saves a copy of the datadir as ``name`` (the server is restarted)"""
+        return self.snapshots.take(name)
+
+    def restore(self, name):
+        """Replaces the datadir by the snapshot ``name`` (the server is restarted)"""
+        return self.snapshots.restore(name)
+
+    def connection(self):
+        """Returns the admin connection (without default database); reconnected after restart.
+
+        It is shared by the helpers of Mysqld; do not use it from other threads
+        (use ``pool()`` instead).
+        """
+        conn, server_pid = self._admin_connection or (None, None)
+        if conn is None or not conn.open or server_pid != self.server_pid:
+            if conn is not None:
+                close_quietly(conn)
+
+            params = self.dsn()
+            del params['db']
+            conn = pymysql.connect(autocommit=True, **params)
+            self._admin_connection = (conn, self.server_pid)
+
+        return conn
+
+    def pool(self, size=None, **kwargs):
+        """Returns a thread-safe pool of connections (``kwargs`` are passed to ``dsn()``)"""
+        key = tuple(sorted(kwargs.items()))
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = ConnectionPool(self, size, **kwargs)
+            return self._pools[key]
+
+    def close_connections(self):
+        if getattr(self, '_admin_connection', None):
+            close_quietly(self._admin_connection[0])
+            self._admin_connection = None
+
+        for pool in getattr(self, '_pools', {}).values():
+            pool.clear()
+
+    @property
+    def schema_dropper(self):
+        if self._schema_dropper is None:
+            self._schema_dropper = SchemaDropper(self)
+        return self._schema_dropper
+
+    def setup(self):
+        # clone data files
+        self.clone_result = None
+        if self.settings['copy_data_from'] and not self.read_only:
+            try:
+                data_dir = self.get_data_directory()
+                with self.timings.measure('copy_data'):
+                    self.clone_result = clone_directory(self.settings['copy_data_from'], data_dir,
+                                                        self.settings['clone_strategies'],
+                                                        os.path.join(self.base_dir, 'overlay'))
+                os.chmod(data_dir, 0o700)
+            except Exception as exc:
+                raise RuntimeError("could not copytree %s to %s: %r" %
+                                   (self.settings['copy_data_from'], data_dir, exc))
+
+        # create directory tree
+        for subdir in self.subdirectories:
+            path = os.path.join(self.base_dir, subdir)
+            if not os.path.exists(path):
+                os.makedirs(path)
+                os.chmod(path, 0o700)
+
+        for path in (self.get_data_directory(), self.my_cnf['tmpdir']):
+            if not os.path.exists(path):
+                os.makedirs(path)
+                os.chmod(path, 0o700)
+
+        try:
+            with self.timings.measure('initialize_database'):
+                self.initialize_database()
+        except Exception:
+            self.cleanup()
+            raise
+
+    def terminate(self, *args):
+        if self._owner_pid == os.getpid():
+            if getattr(self, '_schema_dropper', None):
+                self._schema_dropper.close()
+                self._schema_dropper = None
+
+            self.close_connections()
+
+        super(Mysqld, self).terminate(*args)
+
+    def cleanup(self):
+        if self.child_process is None and getattr(self, 'clone_result', None):
+            if self.clone_result.strategy == 'overlayfs':
+                unmount_overlayfs(self.get_data_directory())
+            self.clone_result = None
+
+        if self.child_process is None and getattr(self, '_ephemeral_dir', None):
+            rmtree(self._ephemeral_dir, ignore_errors=True)
+            self._ephemeral_dir = None
+
+        if self.child_process is None and getattr(self, '_socket_dir', None):
+            rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+
+        if self.child_process is None and 'port' in getattr(self, 'my_cnf', {}):
+            release_port(self.my_cnf['port'])
+
+        super(Mysqld, self).cleanup()
+
+    def initialize_database(self):
+        # assign port if networking not disabled (reserved until the server is stopped)
+        if 'port' not in self.my_cnf and 'skip-networking' not in self.my_cnf:
+            self.my_cnf['port'] = reserve_port()
+
+        self.write_my_cnf()
+
+        if self.read_only and not os.path.exists(os.path.join(self.get_data_directory(), 'mysql')):
+            raise RuntimeError("read_only mode requires initialized datadir: %s" % self.get_data_directory())
+
+        # initialize databse
+        if not os.path.exists(os.path.join(self.get_data_directory(), 'mysql')):
+            args = ["--defaults-file=%s/etc/my.cnf" % self.base_dir,
+                    "--datadir=%s" % self.my_cnf['datadir']]
+
+            if self.mysql_install_db:
+                mysql_base_dir = self.mysql_install_db
+                if os.path.islink(mysql_base_dir):
+                    link = os.readlink(mysql_base_dir)
+                    mysql_base_dir = os.path.join(os.path.dirname(mysql_base_dir),
+                                                  link)
+                    mysql_base_dir = os.path.normpath(mysql_base_dir)
+
+                if re.search('[^/]+/mysql_install_db$', mysql_base_dir):
+                    args.append("--basedir=%s" % re.sub('[^/]+/mysql_install_db$', '', mysql_base_dir))
+
+            try:
+                if self.supports_initialize_insecure():
+                    mysqld_args = [self.mysqld] + args + ["--initialize-insecure"]
+                    mysqld = subprocess.Popen(mysqld_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                    output = mysqld.communicate()[0]
+                    if mysqld.returncode:
+                        raise RuntimeError(output.decode('utf-8', 'replace'))
+                elif self.flavor:  # MariaDB or MySQL < 5.7.6
+                    install_db_args = [self.mysql_install_db] + args
+                    subprocess.Popen(install_db_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()
+                else:  # unknown version; try --initialize-insecure first
+                    mysqld_args = [self.mysqld] + args + ["--initialize-insecure"]
+                    mysqld = subprocess.Popen(mysqld_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                    mysqld.communicate()
+
+                    if mysqld.returncode:  # MySQL < 5.7
+                        install_db_args = [self.mysql_install_db] + args
+                        subprocess.Popen(install_db_args, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT).communicate()
+            except Exception as exc:
+                raise RuntimeError("failed to spawn mysql_install_db: %r" % exc)
+
+    def write_my_cnf(self):
+        with open(os.path.join(self.base_dir, 'etc', 'my.cnf'), 'wt') as my_cnf:
+            my_cnf.write("[mysqld]\n")
+            for key, value in self.my_cnf.items():
+                if value:
+                    my_cnf.write("%s=%s\n" % (key, value))
+                else:
+                    my_cnf.write("%s\n" % key)
+
+    def reassign_port(self):
+        """Switches to another port if the server failed to bind its port; returns True if switched"""
+        port = self.my_cnf.get('port')
+        if self._port_retries <= 0 or not is_reserved(port) or not is_port_conflicted(self.read_bootlog()):
+            return False  # not conflicted, or the port is specified by user
+
+        self._port_retries -= 1
+        release_port(port)
+        self.my_cnf['port'] = reserve_port()
+        self.write_my_cnf()
+        return True
+
+    def relaunch(self):
+        with open(os.path.join(self.base_dir, '%s.log' % self.name), 'wt') as logger:
+            self.child_process = subprocess.Popen(self.get_server_commandline(), stdout=logger, stderr=logger)
+
+    def get_server_commandline(self):
+        return [self.mysqld,
+                '--defaults-file=%s/etc/my.cnf' % self.base_dir,
+                '--user=root']
+
+    def wait_booting(self):
+        boot_timeout = self.settings.get('boot_timeout', self.DEFAULT_BOOT_TIMEOUT)
+        watcher = BootlogWatcher(os.path.join(self.base_dir, '%s.log' % self.name))
+        self.boot_timings = {}
+        exec_at = time()
+        interval = 0.005
+        while True:
+            if self.child_process.poll() is not None:
+                if self.reassign_port():  # port was taken by someone else
+                    self.relaunch()
+                    watcher = BootlogWatcher(os.path.join(self.base_dir, '%s.log' % self.name))
+                    continue
+
+                raise RuntimeError("*** failed to launch %s ***\n" % self.name +
+                                   self.read_bootlog())
+
+            elapsed = time() - exec_at
+            self.record_boot_timings(watcher, elapsed)
+            if self.is_server_available():
+                self.booted(time() - exec_at)
+                break
+
+            if elapsed > boot_timeout:
+                raise RuntimeError("*** failed to launch %s (timeout) ***\n" % self.name +
+                                   self.read_bootlog())
+
+            sleep(interval)
+            interval = min(interval * 2, 0.1)
+
+    def record_boot_timings(self, watcher, elapsed):
+        # record the time of each phase (for diagnosis of slow startup)
+        if 'pid_file' not in self.boot_timings and os.path.exists(self.my_cnf['pid-file']):
+            self.boot_timings['pid_file'] = elapsed
+        if 'bootlog' not in self.boot_timings and watcher.poll():
+            self.boot_timings['bootlog'] = elapsed
+
+    def booted(self, elapsed):
+        self.boot_timings['ready'] = elapsed
+        self.timings.add('boot', elapsed)
+        self.rss_after_boot = get_rss(self.server_pid)
+
+    @property
+    def rss(self):
+        """Resident set size of the server in bytes (None if unavailable)"""
+        return get_rss(self.server_pid)
+
+    def is_server_available(self):
+        return probe_mysqld(self)
+
+    def poststart(self):
+        with self.timings.measure('poststart'):
+            # create test database (read-only datadir already has it)
+            if not self.read_only:
+                self.create_test_database()
+
+            if self.stats_collector:
+                self.stats_collector.start()
+
+        self._started_at = time()
+
+    def create_test_database(self):
+        # not written to the binary log; otherwise replicas (cloned from the primary with
+        # the database) get errant GTIDs of their own, even if it already exists
+        conn = self.connection()
+        conn.query('SET sql_log_bin = 0')
+        try:
+            conn.query('CREATE DATABASE IF NOT EXISTS test')
+        finally:
+            conn.query('SET sql_log_bin = 1')
+
+    def stop(self, *args):
+        running = self.child_process is not None and self._owner_pid == os.getpid()
+        if not running:
+            super(Mysqld, self).stop(*args)
+            return
+
+        self.prestop()
+        with self.timings.measure('stop'):
+            super(Mysqld, self).stop(*args)
+        self.poststop()
+
+    def prestop(self):
+        self.timings.add('running', time() - getattr(self, '_started_at', time()))
+        self.rss_before_stop = self.rss
+        if self.stats_collector:
+            try:
+                self.stats = self.stats_collector.collect()
+            except Exception as exc:
+                self.stats = {'error': repr(exc)}
+
+    def poststop(self):
+        if self.settings['report_file'] or self.settings['on_report']:
+            report = self.report()
+            if self.settings['report_file']:
+                write_report(self.settings['report_file'], report)
+            if self.settings['on_report']:
+                self.settings['on_report'](report)
+
+    def report(self):
+        """Returns timings of lifecycle phases (and statistics gathered at stop) as a dict"""
+        report = OrderedDict([('name', self.name),
+                              ('flavor', self.flavor),
+                              ('version', '.'.join(str(n) for n in self.version) if self.version else None),
+                              ('timings', self.timings.as_dict()),
+                              ('boot_timings', dict(getattr(self, 'boot_timings', {}))),
+                              ('rss', OrderedDict([('after_boot', getattr(self, 'rss_after_boot', None)),
+                                                   ('before_stop', getattr(self, 'rss_before_stop', None))]))])
+        if self.stats is not None:
+            report['stats'] = self.stats
+
+        return report
+
+
+class MysqldFactory(DatabaseFactory):
+    target_class = Mysqld
+
+    def __init__(self, **kwargs):
+        # the cached datadir has to be booted once to be used by read-only servers
+        if kwargs.get('read_only') and not kwargs.get('on_initialized'):
+            kwargs['on_initialized'] = boot_template
+
+        persistent_cache = kwargs.pop('persistent_cache', None)
+        if persistent_cache and kwargs.get('cache_initialized_db'):
+            self.init_with_persistent_cache(persistent_cache, kwargs)
+        else:
+            super(MysqldFactory, self).__init__(**kwargs)
+
+    def init_with_persistent_cache(self, persistent_cache, settings):
+        if not isinstance(persistent_cache, PersistentCache):
+            if persistent_cache is True:
+                persistent_cache = PersistentCache()
+            else:
+                persistent_cache = PersistentCache(persistent_cache)
+
+        mysqld = settings.get('mysqld') or find_program('mysqld', ['bin', 'libexec', 'sbin'])
+        key = persistent_cache.get_key(get_server_version(mysqld),
+                                       settings.get('my_cnf'),
+                                       settings.get('on_initialized'))
+        with persistent_cache.lock(key):
+            data_dir = persistent_cache.lookup(key)
+            if data_dir is None:
+                # initialize datadir in temporary directory, then store it to the cache
+                super(MysqldFactory, self).__init__(**dict(settings))
+                try:
+                    data_dir = persistent_cache.store(key, self.cache.get_data_directory())
+                finally:
+                    super(MysqldFactory, self).clear_cache()
+
+            # protect the entry from eviction by other processes while servers are cloned from it
+            self.cache_holder = persistent_cache.hold(key)
+
+        settings.pop('cache_initialized_db', None)
+        settings.pop('on_initialized', None)
+        settings['copy_data_from'] = data_dir
+
+        self.cache = None  # persistent cache is never removed by clear_cache()
+        self.settings = settings
+        self.persistent_cache = persistent_cache
+
+    def clear_cache(self):
+        super(MysqldFactory, self).clear_cache()
+        if getattr(self, 'cache_holder', None):
+            self.cache_holder.close()  # the persistent cache can be evicted from now on
+            self.cache_holder = None
+
+    def spawn(self, n, max_workers=None):
+        """Launches ``n`` servers concurrently from the cached database"""
+        return start_many(self.target_class, n, self.settings, max_workers)
+
+
+class MysqldSkipIfNotInstalledDecorator(SkipIfNotInstalledDecorator):
+    name = 'mysqld'
+
+    def search_server(self):
+        find_program('mysqld', ['bin', 'libexec', 'sbin'])
+
+
+skipIfNotFound = skipIfNotInstalled = MysqldSkipIfNotInstalledDecorator()
+
+
+def boot_template(mysqld):
+    """``on_initialized`` handler for read-only servers.
+
+    Booting the server once creates ``auto.cnf`` and ``test`` database, which
+    the servers can not create in read-only mode.
+    """
+    pass
+
+
+def build_url(params):
+    """Returns SQLAlchemy URL for the connection parameters (``dsn()``)"""
+    driver = params.get('driver', 'pymysql')
+
+    if 'port' in params:
+        url = ('mysql+%s://%s@%s:%d/%s' %
+               (driver, params['user'], params['host'], params['port'], params['db']))
+
+        if 'charset' in params:
+            url += "?charset=%s" % params['charset']
+    else:
+        url = ('mysql+%s://%s@localhost/%s?unix_socket=%s' %
+               (driver, params['user'], params['db'], params['unix_socket']))
+
+        if 'charset' in params:
+            url += "&charset=%s" % params['charset']
+
+    return url
+
+
+def get_server_version(mysqld):
+    version = discovery_cache.get_version(mysqld)
+    if version is None:
+        try:
+            command = [mysqld, '--version']
+            output = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0]
+            version = output.decode('utf-8').strip()
+        except Exception as exc:
+            raise RuntimeError("failed to get version of mysqld: %r" % exc)
+
+        discovery_cache.set_version(mysqld, version)
+
+    return version
+
+
+def detect_server(mysqld):
+    """Returns flavor and version of mysqld (or ``(None, None)`` if unknown)"""
+    try:
+        return parse_server_version(get_server_version(mysqld))
+    except RuntimeError:
+        return None, None
+
+
+def parse_server_version(text):
+    """Returns flavor (``mysql`` or ``mariadb``) and version tuple from ``mysqld --version``"""
+    matched = re.search(r'Ver (\d+)\.(\d+)\.(\d+)', text)
+    if matched is None:
+        raise RuntimeError("could not parse version of mysqld: %s" % text)
+
+    if 'mariadb' in text.lower():
+        flavor = 'mariadb'
+    else:
+        flavor = 'mysql'
+
+    return flavor, tuple(int(n) for n in matched.groups())
+
+
+def find_program(name, subdirs):
+    path = discovery_cache.get_program(name, subdirs)
+    if path is None:
+        path = search_program(name, subdirs)
+        discovery_cache.set_program(name, subdirs, path)
+
+    return path
+
+
+def search_program(name, subdirs):
+    path = get_path_of(name)
+    if path:
+        return path
+
+    mysql_paths = [os.path.join(dir, 'bin', 'mysql') for dir in SEARCH_PATHS] + \
+                  [get_path_of('mysql')]
+    for mysql_path in mysql_paths:
+        if mysql_path and os.path.exists(mysql_path):
+            for subdir in subdirs:
+                replace = '/%s/%s' % (subdir, name)
+                path = re.sub('/bin/mysql$', replace, mysql_path)
+                if os.path.exists(path):
+                    return path
+
+    raise RuntimeError("command not found: %s" % name)
+
+
+from testing.mysqld.pool import MysqldPool  # NOQA: E402 (depends on MysqldFactory)
+from testing.mysqld.replication import MysqldReplicaSet  # NOQA: E402 (depends on Mysqld)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""asyncio interface of testing.mysqld (Python 3.5+)"""
+
+import os
+import signal
+import socket
+import asyncio
+import functools
+from time import time
+
+from testing.mysqld import Mysqld
+from testing.mysqld.parallel import StartupError, get_instance_settings
+from testing.mysqld.readiness import PROTOCOL_VERSION, BootlogWatcher
+
+
+async def probe_server(unix_socket=None, host=None, port=None, timeout=1.0):
+    """Returns True if the server sends initial handshake packet"""
+    try:
+        if unix_socket and hasattr(socket, 'AF_UNIX'):
+            connecting = asyncio.open_unix_connection(unix_socket)
+        elif port:
+            connecting = asyncio.open_connection(host or '127.0.0.1', port)
+        else:
+            return False
+
+        reader, writer = await asyncio.wait_for(connecting, timeout)
+    except (asyncio.TimeoutError, OSError):
+        return False
+
+    try:
+        header = await asyncio.wait_for(reader.readexactly(5), timeout)  # packet header + protocol version
+        return header[4:5] == PROTOCOL_VERSION
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError):
+        return False
+    finally:
+        writer.close()
+
+
+async def probe_mysqld(mysqld, timeout=1.0):
+    if os.name != 'nt':
+        return await probe_server(unix_socket=mysqld.my_cnf['socket'], timeout=timeout)
+    else:
+        return await probe_server(host=mysqld.my_cnf.get('bind-address'), port=mysqld.my_cnf.get('port'),
+                                  timeout=timeout)
+
+
+async def run_in_executor(func, *args, **kwargs):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class ProcessAdapter(object):
+    """Popen-like interface of asyncio subprocess (for synchronous methods of Mysqld)"""
+
+    def __init__(self, process):
+        self.process = process
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def poll(self):
+        return self.process.returncode
+
+    def send_signal(self, _signal):
+        self.process.send_signal(_signal)
+
+    def kill(self):
+        self.process.kill()
+
+
+class AsyncMysqld(object):
+    """Launches Mysqld without blocking the event loop.
+
+    The server runs as an asyncio subprocess and its readiness is checked
+    with non-blocking probes.  Discovery of programs, bootstrap and cloning
+    of datadir are run in the default executor.  Other attributes (``dsn()``,
+    ``url()``, ``my_cnf`` and so on) are delegated to the ``Mysqld`` object::
+
+        async with AsyncMysqld(my_cnf={'skip-networking': None}) as mysqld:
+            conn = await aiomysql.connect(**mysqld.adsn())
+    """
+
+    def __init__(self, **settings):
+        self.auto_setup = settings.pop('auto_start', 2) >= 2
+        self.settings = dict(settings, auto_start=0)
+        self.mysqld = None
+        self.process = None
+
+    def __getattr__(self, name):
+        mysqld = self.__dict__.get('mysqld')
+        if mysqld is None:
+            raise AttributeError(name)
+        return getattr(mysqld, name)
+
+    def adsn(self, **kwargs):
+        """Returns connection parameters for aiomysql"""
+        params = self.mysqld.dsn(**kwargs)
+        if 'passwd' in params:
+            params['password'] = params.pop('passwd')
+        return params
+
+    async def start(self):
+        if self.mysqld is None:
+            self.mysqld = await run_in_executor(Mysqld, **self.settings)
+            if self.auto_setup:
+                await run_in_executor(self.mysqld.setup)
+
+        if self.process:
+            return self  # already started
+
+        self.mysqld.prestart()
+        await self.spawn()
+        try:
+            await self.wait_booting()
+            await self.poststart()
+        except Exception:
+            await self.stop()
+            raise
+
+        return self
+
+    async def spawn(self):
+        mysqld = self.mysqld
+        with open(os.path.join(mysqld.base_dir, '%s.log' % mysqld.name), 'wt') as logger:
+            try:
+                self.process = await asyncio.create_subprocess_exec(*mysqld.get_server_commandline(),
+                                                                    stdout=logger, stderr=logger)
+            except Exception as exc:
+                raise RuntimeError('failed to launch %s: %r' % (mysqld.name, exc))
+
+        mysqld.child_process = ProcessAdapter(self.process)
+
+    async def wait_booting(self):
+        mysqld = self.mysqld
+        boot_timeout = mysqld.settings.get('boot_timeout', mysqld.DEFAULT_BOOT_TIMEOUT)
+        watcher = BootlogWatcher(os.path.join(mysqld.base_dir, '%s.log' % mysqld.name))
+        mysqld.boot_timings = {}
+        exec_at = time()
+        interval = 0.005
+        while True:
+            if self.process.returncode is not None:
+                if mysqld.reassign_port():  # port was taken by someone else
+                    await self.spawn()
+                    watcher = BootlogWatcher(os.path.join(mysqld.base_dir, '%s.log' % mysqld.name))
+                    continue
+
+                raise RuntimeError("*** failed to launch %s ***\n" % mysqld.name +
+                                   mysqld.read_bootlog())
+
+            elapsed = time() - exec_at
+            mysqld.record_boot_timings(watcher, elapsed)
+            if await probe_mysqld(mysqld):
+                mysqld.booted(time() - exec_at)
+                break
+
+            if elapsed > boot_timeout:
+                raise RuntimeError("*** failed to launch %s (timeout) ***\n" % mysqld.name +
+                                   mysqld.read_bootlog())
+
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 0.1)
+
+    async def poststart(self):
+        try:
+            import aiomysql
+        except ImportError:
+            await run_in_executor(self.mysqld.poststart)  # aiomysql is not installed
+            return
+
+        with self.mysqld.timings.measure('poststart'):
+            # create test database (read-only datadir already has it)
+            if not self.mysqld.read_only:
+                params = self.adsn()
+                del params['db']
+                conn = await aiomysql.connect(**params)
+                try:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute('CREATE DATABASE IF NOT EXISTS test')
+                finally:
+                    conn.close()
+
+            if self.mysqld.stats_collector:
+                await run_in_executor(self.mysqld.stats_collector.start)
+
+        self.mysqld._started_at = time()
+
+    async def stop(self, _signal=signal.SIGTERM):
+        mysqld = self.mysqld
+        if mysqld is None:
+            return
+
+        if self.process is None or mysqld._owner_pid != os.getpid():
+            await run_in_executor(mysqld.stop)  # removes files only
+            return
+
+        await run_in_executor(mysqld.prestop)
+        with mysqld.timings.measure('stop'):
+            if mysqld._schema_dropper:
+                await run_in_executor(mysqld._schema_dropper.close)  # needs the server alive
+                mysqld._schema_dropper = None
+            await run_in_executor(mysqld.close_connections)
+
+            await self.terminate(_signal)
+            await run_in_executor(mysqld.stop)  # removes files
+        mysqld.poststop()
+
+    async def terminate(self, _signal=signal.SIGTERM):
+        try:
+            self.process.send_signal(_signal)
+            try:
+                await asyncio.wait_for(self.process.wait(), self.mysqld.DEFAULT_KILL_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+                raise RuntimeError("*** failed to shutdown mysqld (timeout) ***\n" + self.mysqld.read_bootlog())
+        except ProcessLookupError:
+            pass  # already exited
+        finally:
+            self.process = None
+            self.mysqld.child_process = None
+
+    def __await__(self):
+        return self.start().__await__()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+
+async def start_many(n, **settings):
+    """Launches ``n`` servers concurrently in the event loop"""
+    servers = [AsyncMysqld(**params) for params in get_instance_settings(n, settings)]
+    results = await asyncio.gather(*[server.start() for server in servers], return_exceptions=True)
+    errors = dict((i, result) for i, result in enumerate(results) if isinstance(result, Exception))
+    if errors:
+        await asyncio.gather(*[server.stop() for server in servers], return_exceptions=True)
+        raise StartupError(errors)
+
+    return servers
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Measures lifecycle and fixture-reset strategies of testing.mysqld.
+
+Run offline against a local mysqld::
+
+  python -m testing.mysqld.benchmark --json --output result.json
+  python -m testing.mysqld.benchmark --baseline result.json  # exits 1 on regressions
+
+usage: python -m testing.mysqld.benchmark [--profile NAME] [--sizes MB,...] [--scenario NAME]
+                                          [--queries N] [--repeat N] [--json] [--output FILE]
+                                          [--baseline FILE] [--threshold RATIO]
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import pymysql
+from time import time
+from shutil import rmtree
+from contextlib import closing
+from collections import OrderedDict
+
+from testing.mysqld import Mysqld, MysqldFactory, find_program, get_server_version
+from testing.mysqld.cache import get_directory_size
+from testing.mysqld.clone import clone_directory
+from testing.mysqld.pool import reset_schemas
+
+PROFILES = (None, 'fast')
+SCENARIOS = ('lifecycle', 'cache', 'reset')
+DEFAULT_SIZES = (0, 64)  # size of fixtures in datadir (MB)
+DEFAULT_THRESHOLD = 1.2
+
+
+def measure(func, *args, **kwargs):
+    """Returns the result of ``func`` and elapsed time"""
+    started_at = time()
+    result = func(*args, **kwargs)
+    return result, time() - started_at
+
+
+def summarize(name, profile, samples, **params):
+    result = OrderedDict([('name', name), ('profile', profile or 'default')])
+    result.update(sorted(params.items()))
+    result.update([('mean', sum(samples) / len(samples)),
+                   ('min', min(samples)),
+                   ('max', max(samples)),
+                   ('samples', samples)])
+    return result
+
+
+def get_key(result):
+    """Identifies the same measurement across runs"""
+    params = [(k, v) for k, v in sorted(result.items())
+              if k not in ('name', 'profile', 'mean', 'min', 'max', 'samples', 'strategy', 'datadir_size')]
+    return '%s[%s]' % (result['name'], ','.join(['profile=%s' % result['profile']] +
+                                                ['%s=%s' % item for item in params]))
+
+
+def measure_queries(mysqld, queries):
+    """Returns mean latency of INSERT statements committed one by one"""
+    with closing(pymysql.connect(**mysqld.dsn())) as conn:
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("CREATE TABLE benchmark(id int PRIMARY KEY, value varchar(256))")
+
+            started_at = time()
+            for i in range(queries):
+                cursor.execute("INSERT INTO benchmark VALUES(%s, 'hello')", (i,))
+                conn.commit()
+            return (time() - started_at) / queries
+
+
+def fill(size):
+    """Returns ``on_initialized`` handler creating about ``size`` MB of fixtures"""
+    def handler(mysqld):
+        with closing(pymysql.connect(**mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("CREATE TABLE fixtures(id int PRIMARY KEY AUTO_INCREMENT, value longblob)")
+                for _ in range(size):
+                    cursor.execute("INSERT INTO fixtures(value) VALUES(REPEAT('x', 1024 * 1024))")
+                conn.commit()
+
+    return handler
+
+
+def benchmark_lifecycle(profile, queries, repeat):
+    """cold init (bootstrap and boot), stop and query latency"""
+    init, stop, latency = [], [], []
+    for _ in range(repeat):
+        mysqld, elapsed = measure(Mysqld, profile=profile, my_cnf={'skip-networking': None})
+        try:
+            init.append(elapsed)
+            latency.append(measure_queries(mysqld, queries))
+        finally:
+            stop.append(measure(mysqld.stop)[1])
+
+    return [summarize('cold_init', profile, init),
+            summarize('stop', profile, stop),
+            summarize('query', profile, latency, queries=queries)]
+
+
+def benchmark_cache(profile, size, repeat):
+    """cached start of MysqldFactory and clone of datadir for the size of fixtures"""
+    factory = MysqldFactory(cache_initialized_db=True, on_initialized=fill(size),
+                            profile=profile, my_cnf={'skip-networking': None})
+    tmpdir = tempfile.mkdtemp()
+    try:
+        source = factory.cache.get_data_directory()
+        datadir_size = get_directory_size(source)
+
+        start, clone, strategies = [], [], set()
+        for i in range(repeat):
+            mysqld, elapsed = measure(factory)
+            start.append(elapsed)
+            mysqld.stop()
+
+            result = clone_directory(source, os.path.join(tmpdir, str(i)))
+            clone.append(result.elapsed)
+            strategies.add(result.strategy)
+
+        return [summarize('cached_start', profile, start, size=size, datadir_size=datadir_size),
+                summarize('clone', profile, clone, size=size, datadir_size=datadir_size,
+                          strategy='/'.join(sorted(strategies)))]
+    finally:
+        rmtree(tmpdir, ignore_errors=True)
+        factory.clear_cache()
+
+
+def benchmark_reset(profile, size, repeat):
+    """latency to reset fixtures: rollback session, snapshot restore, dropping schemas and restart"""
+    factory = MysqldFactory(cache_initialized_db=True, on_initialized=fill(size),
+                            profile=profile, my_cnf={'skip-networking': None})
+    mysqld = factory()
+    try:
+        session = mysqld.rollback_session()
+        rollback = []
+        for _ in range(repeat):
+            session.connection.query("DELETE FROM fixtures")
+            rollback.append(measure(session.reset)[1])
+        session.close()
+
+        mysqld.snapshot('benchmark')
+        snapshot = []
+        for _ in range(repeat):
+            with closing(pymysql.connect(**mysqld.dsn())) as conn:
+                conn.query("DELETE FROM fixtures")
+                conn.commit()
+            snapshot.append(mysqld.restore('benchmark').elapsed)
+
+        schemas = []
+        for _ in range(repeat):
+            mysqld.restore('benchmark')
+            schemas.append(measure(reset_schemas, mysqld)[1])
+
+        restart = []
+        for _ in range(repeat):
+            def replace():
+                mysqld.stop()
+                return factory()
+            mysqld, elapsed = measure(replace)
+            restart.append(elapsed)
+
+        return [summarize('reset_rollback', profile, rollback, size=size),
+                summarize('reset_snapshot', profile, snapshot, size=size),
+                summarize('reset_schemas', profile, schemas, size=size),
+                summarize('reset_restart', profile, restart, size=size)]
+    finally:
+        mysqld.stop()
+        factory.clear_cache()
+
+
+def run(profiles=PROFILES, sizes=DEFAULT_SIZES, scenarios=SCENARIOS, queries=1000, repeat=3):
+    results = []
+    for profile in profiles:
+        if 'lifecycle' in scenarios:
+            results.extend(benchmark_lifecycle(profile, queries, repeat))
+        for size in sizes:
+            if 'cache' in scenarios:
+                results.extend(benchmark_cache(profile, size, repeat))
+            if 'reset' in scenarios:
+                results.extend(benchmark_reset(profile, size, repeat))
+
+    return OrderedDict([('server', get_server_version(find_program('mysqld', ['bin', 'libexec', 'sbin']))),
+                        ('platform', platform.platform()),
+                        ('python', platform.python_version()),
+                        ('repeat', repeat),
+                        ('results', results)])
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compares mean of each result with the baseline; returns a list of comparisons"""
+    baselines = dict((get_key(result), result) for result in baseline['results'])
+    comparisons = []
+    for result in results['results']:
+        base = baselines.get(get_key(result))
+        if base is None or not base['mean']:
+            continue
+
+        ratio = result['mean'] / base['mean']
+        comparisons.append(OrderedDict([('key', get_key(result)),
+                                        ('baseline', base['mean']),
+                                        ('mean', result['mean']),
+                                        ('ratio', ratio),
+                                        ('regression', ratio > threshold)]))
+
+    return comparisons
+
+
+def print_table(results, comparisons, out=sys.stdout):
+    ratios = dict((c['key'], c) for c in comparisons)
+    out.write('%-60s %12s %12s %10s\n' % ('benchmark', 'mean(ms)', 'min(ms)', 'baseline'))
+    for result in results['results']:
+        key = get_key(result)
+        line = '%-60s %12.3f %12.3f' % (key, result['mean'] * 1000, result['min'] * 1000)
+        if key in ratios:
+            line += ' %9.2fx%s' % (ratios[key]['ratio'], ' !' if ratios[key]['regression'] else '')
+        out.write(line + '\n')
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description='benchmark of testing.mysqld lifecycle and reset strategies')
+    parser.add_argument('--profile', action='append', choices=['default', 'fast'],
+                        help='profile of the server (default: all)')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma separated sizes of fixtures in MB (default: %(default)s)')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='scenario to run (default: all)')
+    parser.add_argument('--queries', type=int, default=1000, help='number of INSERT statements')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measurements for each benchmark')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--output', help='write results to the file as JSON')
+    parser.add_argument('--baseline', help='compare results with the JSON file written by --output')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='ratio to the baseline regarded as a regression (default: %(default)s)')
+    options = parser.parse_args(argv)
+
+    profiles = [None if name == 'default' else name for name in options.profile or ['default', 'fast']]
+    sizes = [int(size) for size in options.sizes.split(',') if size]
+    results = run(profiles, sizes, options.scenario or SCENARIOS, options.queries, options.repeat)
+
+    comparisons = []
+    if options.baseline:
+        with open(options.baseline) as fd:
+            comparisons = compare(results, json.load(fd), options.threshold)
+        results['comparisons'] = comparisons
+
+    if options.output:
+        with open(options.output, 'w') as fd:
+            json.dump(results, fd, indent=2)
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, comparisons)
+
+    if any(c['regression'] for c in comparisons):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
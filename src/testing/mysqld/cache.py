@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import hashlib
+import functools
+from shutil import copytree, rmtree
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+# these settings differ on each instance; they never affect the contents of datadir
+INSTANCE_SPECIFIC_SETTINGS = ('socket', 'datadir', 'pid-file', 'tmpdir', 'port')
+
+# values of these types are represented in the same way across processes
+try:
+    STABLE_TYPES = (bool, int, long, float, complex, str, unicode, bytes)  # noqa: F821 (Python 2)
+except NameError:
+    STABLE_TYPES = (bool, int, float, complex, str, bytes)
+
+
+def get_default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(cache_home, 'testing.mysqld')
+
+
+def get_qualified_name(value):
+    """Returns the name of the function or class, which is the same across processes"""
+    name = getattr(value, '__qualname__', None) or getattr(value, '__name__', None)
+    if name is None:  # instance of a class
+        return get_qualified_name(type(value))
+    else:
+        return '%s.%s' % (getattr(value, '__module__', None) or '', name)
+
+
+def get_handler_identity(handler):
+    """Returns a string identifying ``on_initialized`` handler across processes"""
+    if handler is None:
+        return ''
+
+    # invalidate the cache when the body of the handler (or the values it captures) is modified
+    digest = hashlib.sha1()
+    update_digest(digest, handler, set())
+    if isinstance(handler, functools.partial):
+        handler = handler.func
+    return '%s:%s' % (get_qualified_name(handler), digest.hexdigest())
+
+
+def update_digest(digest, value, seen):
+    """Feeds the code, constants, defaults and closure of functions (recursively) to the digest
+
+    Only values whose representation is stable across processes are fed; others
+    (ex. instances of classes) are represented by the names of their classes.
+    """
+    if id(value) in seen:
+        digest.update(b'<recursion>')
+        return
+    seen.add(id(value))
+
+    code = getattr(value, '__code__', None)
+    if code is not None:  # function or method
+        update_digest(digest, code, seen)
+        update_digest(digest, getattr(value, '__defaults__', None), seen)
+        update_digest(digest, getattr(value, '__kwdefaults__', None), seen)
+        for cell in getattr(value, '__closure__', None) or ():
+            try:
+                update_digest(digest, cell.cell_contents, seen)
+            except ValueError:  # empty cell
+                digest.update(b'<empty>')
+    elif isinstance(value, functools.partial):
+        update_digest(digest, value.func, seen)
+        update_digest(digest, value.args, seen)
+        update_digest(digest, value.keywords, seen)
+    elif hasattr(value, 'co_code'):  # code object
+        digest.update(value.co_code)
+        digest.update(repr(value.co_names).encode('utf-8'))
+        for const in value.co_consts:
+            update_digest(digest, const, seen)
+    elif isinstance(value, (tuple, list)):
+        digest.update(('<%s:%d>' % (type(value).__name__, len(value))).encode('utf-8'))
+        for item in value:
+            update_digest(digest, item, seen)
+    elif isinstance(value, (set, frozenset)):
+        digest.update(('<%s:%d>' % (type(value).__name__, len(value))).encode('utf-8'))
+        for item in sorted(value, key=repr):
+            update_digest(digest, item, seen)
+    elif isinstance(value, dict):
+        digest.update(('<dict:%d>' % len(value)).encode('utf-8'))
+        for key in sorted(value, key=repr):
+            update_digest(digest, key, seen)
+            update_digest(digest, value[key], seen)
+    elif value is None or isinstance(value, STABLE_TYPES):
+        digest.update(repr(value).encode('utf-8'))
+    else:  # the default repr() contains the address of the object
+        digest.update(('<%s>' % get_qualified_name(value)).encode('utf-8'))
+    digest.update(b'\0')
+
+
+class PersistentCache(object):
+    """On-disk cache of initialized datadirs shared between processes.
+
+    Each entry is a pristine datadir stored under ``path/<key>``.  Entries are
+    built under a file lock (``path/<key>.lock``) so concurrent processes
+    initialize the same datadir only once, and the least recently used
+    entries are evicted when ``max_entries`` or ``max_size`` is exceeded
+    (except ones held by readers with a shared lock on ``path/<key>.readers``).
+    """
+
+    def __init__(self, path=None, max_entries=8, max_size=None):
+        self.path = path or get_default_cache_dir()
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        if not os.path.exists(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                if not os.path.isdir(self.path):  # not created by other process
+                    raise
+
+    def get_key(self, version, my_cnf=None, on_initialized=None):
+        digest = hashlib.sha1()
+        digest.update(version.encode('utf-8'))
+        for key, value in sorted((my_cnf or {}).items()):
+            if key not in INSTANCE_SPECIFIC_SETTINGS:
+                digest.update(('\n%s=%s' % (key, value)).encode('utf-8'))
+        digest.update(('\n' + get_handler_identity(on_initialized)).encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.path, key)
+
+    @contextmanager
+    def lock(self, key, blocking=True):
+        """Locks the entry exclusively; yields False if ``blocking`` is off and the entry is busy"""
+        with open(os.path.join(self.path, key + '.lock'), 'a') as fd:
+            if fcntl is None:
+                yield True
+                return
+
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                yield False  # locked by other process
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def hold(self, key):
+        """Locks the entry shared while it is in use (cloned or run over); close the returned file to release.
+
+        Entries held by any process are never evicted.
+        """
+        fd = open(os.path.join(self.path, key + '.readers'), 'a')
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        return fd
+
+    def lookup(self, key):
+        path = self.get_path(key)
+        if not os.path.isdir(path):
+            return None
+
+        os.utime(path, None)  # mark as recently used
+        return path
+
+    def store(self, key, data_dir):
+        path = self.get_path(key)
+        tmpdir = '%s.tmp-%d' % (path, os.getpid())
+        try:
+            copytree(data_dir, tmpdir)
+            os.rename(tmpdir, path)
+            os.utime(path, None)
+        except Exception as exc:
+            rmtree(tmpdir, ignore_errors=True)
+            raise RuntimeError("could not store %s to cache: %r" % (data_dir, exc))
+
+        self.evict(keep=key)
+        return path
+
+    def entries(self):
+        """Returns the keys of cached datadirs (most recently used first)"""
+        keys = [name for name in os.listdir(self.path)
+                if '.' not in name and os.path.isdir(self.get_path(name))]
+        return sorted(keys, key=lambda key: os.path.getmtime(self.get_path(key)), reverse=True)
+
+    def evict(self, keep=None):
+        total_size = 0
+        for i, key in enumerate(self.entries()):
+            size = get_directory_size(self.get_path(key))
+            total_size += size
+            if key == keep:
+                continue
+
+            if (self.max_entries is not None and i >= self.max_entries or
+                    self.max_size is not None and total_size > self.max_size):
+                self.remove(key)
+                total_size -= size
+
+    def remove(self, key):
+        # entries being built or used by other processes are left as is
+        with self.lock(key, blocking=False) as locked:
+            if not locked:
+                return
+
+            with open(os.path.join(self.path, key + '.readers'), 'a') as fd:
+                if fcntl:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except (IOError, OSError):
+                        return  # held by readers
+
+                rmtree(self.get_path(key), ignore_errors=True)
+
+    def clear(self):
+        for key in self.entries():
+            self.remove(key)
+
+
+def get_directory_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass  # removed while walking
+
+    return size
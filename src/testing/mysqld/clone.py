@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import errno
+import subprocess
+from time import time
+from shutil import copy2, copystat
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+# ioctl(2) request to share extents between files (btrfs, xfs and so on)
+FICLONE = 0x40049409
+
+# mysqld never modifies these files in place (DDL replaces them by rename)
+HARDLINKABLE_SUFFIXES = ('.frm', '.TRG', '.TRN')
+
+# overlayfs is not tried by default; it needs privileges and leaves a mount point to unmount
+DEFAULT_STRATEGIES = ('reflink', 'hardlink', 'copy')
+
+
+class CloneResult(object):
+    def __init__(self, source, destination):
+        self.source = source
+        self.destination = destination
+        self.files = {}  # strategy name -> number of files
+        self.elapsed = None
+
+    @property
+    def strategy(self):
+        """Names of strategies used for the clone (e.g. ``reflink``, ``hardlink+copy``)"""
+        names = [name for name in ('overlayfs', 'reflink', 'hardlink', 'copy') if name in self.files]
+        return '+'.join(names) or 'copy'
+
+    def count(self, strategy):
+        self.files[strategy] = self.files.get(strategy, 0) + 1
+
+    def __repr__(self):
+        return '<CloneResult strategy=%s files=%r elapsed=%.3fs>' % (self.strategy, self.files, self.elapsed or 0)
+
+
+def clone_directory(source, destination, strategies=None, workdir=None):
+    """Clones ``source`` directory tree to ``destination`` as cheap as possible.
+
+    ``strategies`` is a sequence of ``overlayfs``, ``reflink``, ``hardlink`` and ``copy``;
+    ``overlayfs`` requires ``workdir`` to place the upper layer of the mount.
+    """
+    if strategies is None:
+        strategies = DEFAULT_STRATEGIES
+
+    started_at = time()
+    result = CloneResult(source, destination)
+    if 'overlayfs' in strategies and workdir and mount_overlayfs(source, destination, workdir):
+        result.count('overlayfs')
+    else:
+        cloner = FileCloner(strategies)
+        for root, dirs, files in os.walk(source):
+            target = os.path.join(destination, os.path.relpath(root, source))
+            os.makedirs(target)
+            for filename in files:
+                strategy = cloner.clone(os.path.join(root, filename), os.path.join(target, filename))
+                result.count(strategy)
+            copystat(root, target)
+
+    result.elapsed = time() - started_at
+    return result
+
+
+class FileCloner(object):
+    def __init__(self, strategies):
+        self.reflink = 'reflink' in strategies and fcntl is not None
+        self.hardlink = 'hardlink' in strategies
+
+    def clone(self, source, destination):
+        if self.reflink:
+            try:
+                reflink(source, destination)
+                return 'reflink'
+            except (IOError, OSError) as exc:
+                if os.path.exists(destination):
+                    os.remove(destination)
+                if exc.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    self.reflink = False  # not supported on this filesystem
+                else:
+                    raise
+
+        if self.hardlink and source.endswith(HARDLINKABLE_SUFFIXES):
+            try:
+                os.link(source, destination)
+                return 'hardlink'
+            except OSError as exc:
+                if exc.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    self.hardlink = False  # not permitted across these directories
+                else:
+                    raise
+
+        copy2(source, destination)
+        return 'copy'
+
+
+def reflink(source, destination):
+    with open(source, 'rb') as src:
+        with open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    copystat(source, destination)
+
+
+def mount_overlayfs(lowerdir, mountpoint, workdir):
+    upperdir = os.path.join(workdir, 'upper')
+    overlay_workdir = os.path.join(workdir, 'work')
+    for path in (upperdir, overlay_workdir, mountpoint):
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+    options = 'lowerdir=%s,upperdir=%s,workdir=%s' % (lowerdir, upperdir, overlay_workdir)
+    try:
+        with open(os.devnull, 'wb') as devnull:
+            subprocess.check_call(['mount', '-t', 'overlay', 'overlay', '-o', options, mountpoint],
+                                  stdout=devnull, stderr=devnull)
+        return True
+    except Exception:
+        os.rmdir(mountpoint)  # makes clone_directory() to fall back to other strategies
+        return False
+
+
+def unmount_overlayfs(mountpoint):
+    with open(os.devnull, 'wb') as devnull:
+        subprocess.call(['umount', mountpoint], stdout=devnull, stderr=devnull)
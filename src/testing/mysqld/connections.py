@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+import pymysql
+from contextlib import contextmanager
+
+
+def close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass  # already disconnected
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of pymysql connections to the server.
+
+    Up to ``size`` idle connections are kept for reuse; ``acquire()`` opens
+    a new connection if none of them is idle.  Connections opened before a
+    restart of the server are discarded instead of being reused.
+    """
+    DEFAULT_SIZE = 4
+
+    def __init__(self, mysqld, size=None, **params):
+        self.mysqld = mysqld
+        self.size = size or self.DEFAULT_SIZE
+        self.params = dict(params)
+        self.params.setdefault('db', None)  # no default database
+        self.lock = threading.Lock()
+        self.idle = []  # list of (connection, pid of server)
+        self.servers = {}  # id of connection in use -> pid of server
+        self.closed = False
+
+    def connect(self):
+        return pymysql.connect(**self.mysqld.dsn(**self.params))
+
+    def acquire(self):
+        server_pid = self.mysqld.server_pid
+        with self.lock:
+            while self.idle:
+                conn, pid = self.idle.pop()
+                if pid == server_pid and conn.open:
+                    self.servers[id(conn)] = pid
+                    return conn
+                close_quietly(conn)  # opened before restart
+
+        conn = self.connect()
+        with self.lock:
+            self.servers[id(conn)] = server_pid
+        return conn
+
+    def release(self, conn):
+        with self.lock:
+            pid = self.servers.pop(id(conn), None)
+
+        if self.closed or pid != self.mysqld.server_pid or not conn.open:
+            close_quietly(conn)
+            return
+
+        try:
+            conn.rollback()  # do not pass the transaction over to the next user
+        except Exception:
+            close_quietly(conn)
+            return
+
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append((conn, pid))
+                return
+
+        close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def clear(self):
+        """Closes all idle connections"""
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for conn, _ in idle:
+            close_quietly(conn)
+
+    def close(self):
+        self.closed = True
+        self.clear()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import json
+import threading
+
+from testing.mysqld.cache import get_default_cache_dir
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DiscoveryCache(object):
+    """Remembers the paths of programs and the versions of mysqld.
+
+    Results are kept in memory and in a JSON file shared between processes.
+    Paths are keyed by the name of the program and ``$PATH``, versions by
+    the path of the binary; both are invalidated when the binary is modified.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_default_cache_dir(), 'discovery.json')
+        self.programs = {}
+        self.versions = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        self.loaded = True
+        data = self.read()
+        self.programs.update(data.get('programs', {}))
+        self.versions.update(data.get('versions', {}))
+
+    def read(self):
+        try:
+            with open(self.path) as fd:
+                return json.load(fd)
+        except (IOError, OSError, ValueError):
+            return {}  # not created yet or broken
+
+    def save(self, name, key, entry):
+        """Adds the entry to the file; entries stored by other processes are merged under the file lock"""
+        try:
+            if not os.path.exists(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+
+            with open(self.path + '.lock', 'a') as lockfile:
+                if fcntl:
+                    fcntl.flock(lockfile, fcntl.LOCK_EX)
+
+                data = self.read()
+                data.setdefault('programs', {})
+                data.setdefault('versions', {})
+                data[name][key] = entry
+                for table in (data['programs'], data['versions']):
+                    for stale in [k for k, value in table.items() if not os.path.exists(value['path'])]:
+                        del table[stale]  # the binary has been removed
+
+                tmpfile = '%s.%d' % (self.path, os.getpid())
+                with open(tmpfile, 'w') as fd:
+                    json.dump(data, fd)
+                os.rename(tmpfile, self.path)
+        except (IOError, OSError):
+            return  # cache directory is not writable
+
+        self.programs.update(data['programs'])
+        self.versions.update(data['versions'])
+
+    def lookup(self, name, key):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+
+            entry = getattr(self, name).get(key)
+            if entry and get_mtime(entry['path']) == entry['mtime']:
+                return entry
+            else:
+                return None
+
+    def store(self, name, key, path, **values):
+        entry = dict(values, path=path, mtime=get_mtime(path))
+        with self.lock:
+            getattr(self, name)[key] = entry
+            self.save(name, key, entry)
+
+    def get_program(self, name, subdirs):
+        entry = self.lookup('programs', self.get_program_key(name, subdirs))
+        return entry and entry['path']
+
+    def set_program(self, name, subdirs, path):
+        self.store('programs', self.get_program_key(name, subdirs), path)
+
+    def get_program_key(self, name, subdirs):
+        return '%s:%s:%s' % (name, ','.join(subdirs), os.environ.get('PATH', ''))
+
+    def get_version(self, path):
+        entry = self.lookup('versions', path)
+        return entry and entry['version']
+
+    def set_version(self, path, version):
+        self.store('versions', path, path, version=version)
+
+    def clear(self):
+        with self.lock:
+            self.programs.clear()
+            self.versions.clear()
+            self.loaded = True
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
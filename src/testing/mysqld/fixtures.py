@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import io
+import re
+import csv
+import sys
+import pymysql
+from time import time
+from itertools import islice
+from contextlib import closing
+
+from testing.mysqld.schema import quote
+
+QUOTES = ('\'', '"', '`')
+QUOTE_END = {'\'': re.compile(r"\\.|'", re.S),
+             '"': re.compile(r'\\.|"', re.S),
+             '`': re.compile(r'`')}
+BLOCK_COMMENT_END = re.compile(r'\*/')
+DELIMITER = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.I)
+
+# errors raised when LOAD DATA LOCAL INFILE is disabled on the server or the client
+LOCAL_INFILE_DISABLED = (1148,  # ER_NOT_ALLOWED_COMMAND
+                         3948,  # ER_CLIENT_LOCAL_FILES_DISABLED
+                         2068)  # CR_LOAD_DATA_LOCAL_INFILE_REJECTED
+
+# python codec name -> character set of MySQL
+CHARSETS = {'utf-8': 'utf8mb4', 'utf8': 'utf8mb4', 'latin-1': 'latin1', 'ascii': 'ascii'}
+
+
+def split_statements(lines):
+    """Splits SQL script (e.g. output of mysqldump) into statements.
+
+    Handles quoted strings, comments and ``DELIMITER`` command of mysql client.
+    """
+    delimiter = ';'
+    tokens = re.compile(r"['\"`]|/\*|--(?=\s)|--$|#|" + re.escape(delimiter))
+    state = None
+    buf = []
+    blank = True  # buf has only whitespaces (tracked incrementally; joining buf on each line is quadratic)
+    for line in lines:
+        if state is None and blank:
+            matched = DELIMITER.match(line)
+            if matched:
+                delimiter = matched.group(1)
+                tokens = re.compile(r"['\"`]|/\*|--(?=\s)|--$|#|" + re.escape(delimiter))
+                buf = []
+                continue
+
+        pos = 0
+        while pos < len(line):
+            if state is None:
+                matched = tokens.search(line, pos)
+                if matched is None:
+                    buf.append(line[pos:])
+                    blank = blank and not line[pos:].strip()
+                    break
+
+                buf.append(line[pos:matched.start()])
+                blank = blank and not line[pos:matched.start()].strip()
+                token = matched.group()
+                pos = matched.end()
+                if token == delimiter:
+                    if not blank:
+                        yield ''.join(buf).strip()
+                    buf = []
+                    blank = True
+                elif token in QUOTES or token == '/*':
+                    state = token
+                    buf.append(token)
+                    blank = False
+                else:  # line comment
+                    buf.append('\n')
+                    break
+            else:
+                if state == '/*':
+                    matched = BLOCK_COMMENT_END.search(line, pos)
+                else:
+                    matched = QUOTE_END[state].search(line, pos)
+
+                if matched is None:
+                    buf.append(line[pos:])
+                    break
+
+                buf.append(line[pos:matched.end()])
+                pos = matched.end()
+                if matched.group() in (state, '*/'):
+                    state = None
+
+    statement = ''.join(buf).strip()
+    if statement:
+        yield statement
+
+
+class LoadResult(object):
+    def __init__(self, rows, elapsed):
+        self.rows = rows
+        self.elapsed = elapsed
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed == 0:
+            return float(self.rows)
+        return self.rows / self.elapsed
+
+    def __repr__(self):
+        return ('<LoadResult rows=%d elapsed=%.3fs rows_per_second=%.1f>' %
+                (self.rows, self.elapsed, self.rows_per_second))
+
+
+class FixtureLoader(object):
+    """Loads fixtures into the database in bulk.
+
+    During the load, ``unique_checks`` and ``foreign_key_checks`` are disabled
+    and all rows are committed at once.  It is intended to be used in
+    ``on_initialized`` handler of ``MysqldFactory``; the loaded data is cached
+    with the initialized database.
+    """
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, mysqld, db='test', batch_size=None):
+        self.mysqld = mysqld
+        self.db = db
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+
+    def load(self, func):
+        started_at = time()
+        with self.mysqld.pool(db=self.db, local_infile=True).connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('SET unique_checks = 0, foreign_key_checks = 0')
+                try:
+                    rows = func(cursor)
+                    conn.commit()
+                finally:
+                    cursor.execute('SET unique_checks = 1, foreign_key_checks = 1')
+
+        return LoadResult(rows, time() - started_at)
+
+    def load_sql(self, source, encoding='utf-8'):
+        """Executes SQL script (file object or path)"""
+        def execute(cursor):
+            rows = 0
+            for statement in split_statements(source):
+                rows += cursor.execute(statement)
+            return rows
+
+        if not hasattr(source, 'read'):
+            with io.open(source, encoding=encoding) as source:
+                return self.load(execute)
+        else:
+            return self.load(execute)
+
+    def load_rows(self, table, rows, columns=None):
+        """Inserts rows (sequences or dicts) with multi-row INSERT statements"""
+        def insert(cursor):
+            iterator = iter(rows)
+            names = columns
+            count = 0
+            while True:
+                batch = list(islice(iterator, self.batch_size))
+                if not batch:
+                    break
+
+                if names is None and isinstance(batch[0], dict):
+                    names = list(batch[0].keys())
+                if isinstance(batch[0], dict):
+                    batch = [[row[name] for name in names] for row in batch]
+
+                count += cursor.executemany(get_insert_statement(table, names, len(batch[0])), batch)
+
+            return count
+
+        return self.load(insert)
+
+    def load_csv(self, table, path, columns=None, delimiter=',', header=True, encoding='utf-8'):
+        """Loads CSV file with ``LOAD DATA LOCAL INFILE`` (or INSERT if local infile is disabled)
+
+        Fields are parsed as RFC 4180; backslashes are not escape characters.
+        """
+        statement = ("LOAD DATA LOCAL INFILE %%s INTO TABLE %s CHARACTER SET %s "
+                     "FIELDS TERMINATED BY %%s OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY %%s" %
+                     (quote(table), CHARSETS.get(encoding.lower(), encoding)))
+        if header:
+            statement += ' IGNORE 1 LINES'
+        if columns:
+            statement += ' (%s)' % ', '.join(quote(name) for name in columns)
+
+        def load_data(cursor):
+            enable_local_infile(cursor)
+            return cursor.execute(statement, (path, delimiter, get_line_terminator(path)))
+
+        try:
+            return self.load(load_data)
+        except pymysql.err.MySQLError as exc:
+            if exc.args and exc.args[0] in LOCAL_INFILE_DISABLED:
+                return self.load_rows(table, read_csv(path, delimiter, header, encoding), columns)
+            raise
+
+    def load_tsv(self, table, path, columns=None, header=True, encoding='utf-8'):
+        return self.load_csv(table, path, columns, '\t', header, encoding)
+
+
+def get_insert_statement(table, columns, width):
+    if columns:
+        names = ' (%s)' % ', '.join(quote(name) for name in columns)
+    else:
+        names = ''
+
+    return 'INSERT INTO %s%s VALUES (%s)' % (quote(table), names, ', '.join(['%s'] * width))
+
+
+def enable_local_infile(cursor):
+    cursor.execute("SELECT @@GLOBAL.local_infile")
+    if not cursor.fetchone()[0]:
+        cursor.execute("SET GLOBAL local_infile = 1")  # disabled by default since MySQL 8.0
+
+
+def get_line_terminator(path):
+    """Returns the line terminator of the file ('\\r\\n' or '\\n')"""
+    with open(path, 'rb') as fd:
+        line = fd.readline()
+
+    if line.endswith(b'\r\n'):
+        return '\r\n'
+    else:
+        return '\n'
+
+
+def read_csv(path, delimiter, header, encoding):
+    if sys.version_info < (3,):
+        fd = open(path, 'rb')
+    else:
+        fd = io.open(path, encoding=encoding, newline='')
+
+    with fd:
+        reader = csv.reader(fd, delimiter=delimiter)
+        if header:
+            next(reader, None)
+        for row in reader:
+            yield row
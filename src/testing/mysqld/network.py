@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import re
+import errno
+import atexit
+import tempfile
+import threading
+
+from testing.common.database import get_unused_port
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+MAX_RESERVE_ATTEMPTS = 100
+
+# sizeof(sockaddr_un.sun_path) is 108 on Linux and 104 on BSD and macOS (including NUL)
+MAX_SOCKET_PATH = 103
+
+# mysqld reports this when the port is taken by another process
+PORT_CONFLICT = re.compile(r'Bind on TCP/IP port')
+
+# port -> PortReservation held by this process
+reservations = {}
+reservations_lock = threading.Lock()
+
+
+def get_lock_directory():
+    return os.path.join(tempfile.gettempdir(), 'testing.mysqld-ports')
+
+
+class PortReservation(object):
+    """A port locked by ``<lock directory>/<port>.lock`` until released.
+
+    Other processes using testing.mysqld skip the locked ports, so a port is
+    never given to two servers even if it is not bound until mysqld starts.
+    """
+
+    def __init__(self, port, path, fd):
+        self.port = port
+        self.path = path
+        self.fd = fd
+        self.pid = os.getpid()
+
+    def release(self):
+        if self.fd is None or self.pid != os.getpid():
+            return  # already released, or inherited from the parent process
+
+        try:
+            os.remove(self.path)  # remove it before unlock; see acquire_lock()
+        except OSError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+
+def open_lock_file(path):
+    """Opens the lock file; it is created readable by all users to be locked by them too"""
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+
+    # O_EXCL: O_CREAT on files of other users in sticky directories fails (fs.protected_regular)
+    fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDONLY, 0o644)
+    try:
+        os.fchmod(fd, 0o644)  # regardless of umask
+    except OSError:
+        pass
+    return fd
+
+
+def acquire_lock(path):
+    """Returns a file descriptor of the lock file locked exclusively (or None if locked by others)"""
+    try:
+        fd = open_lock_file(path)
+    except OSError as exc:
+        if exc.errno in (errno.EACCES, errno.EPERM, errno.EEXIST):
+            return None  # owned by another user, or created by others just now
+        raise
+
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        # the file might be removed by the owner between open() and flock()
+        if os.fstat(fd).st_ino != os.stat(path).st_ino:
+            os.close(fd)
+            return None
+    except (IOError, OSError) as exc:
+        os.close(fd)
+        if exc.errno in (errno.EAGAIN, errno.EACCES, errno.ENOENT):
+            return None
+        raise
+
+    return fd
+
+
+def reserve_port(directory=None):
+    """Returns an unused port reserved for this process; it is kept until ``release_port()``"""
+    directory = directory or get_lock_directory()
+    try:
+        os.makedirs(directory)
+        os.chmod(directory, 0o1777)  # shared between users like /tmp
+    except OSError:
+        pass  # already exists
+
+    for _ in range(MAX_RESERVE_ATTEMPTS):
+        port = get_unused_port()
+        with reservations_lock:
+            if port in reservations:
+                continue
+
+            path = os.path.join(directory, '%d.lock' % port)
+            fd = acquire_lock(path)
+            if fd is not None:
+                reservations[port] = PortReservation(port, path, fd)
+                return port
+
+    raise RuntimeError("could not reserve an unused port: all candidates are locked")
+
+
+def release_port(port):
+    """Releases the reservation of the port (does nothing if it is not reserved by this process)"""
+    with reservations_lock:
+        reservation = reservations.get(port)
+        if reservation and reservation.pid == os.getpid():
+            reservation.release()
+            del reservations[port]
+
+
+@atexit.register
+def release_all_ports():
+    """Releases all reservations of this process (to remove their lock files)"""
+    for port in list(reservations):
+        release_port(port)
+
+
+def is_reserved(port):
+    """Returns True if the port is reserved by this process"""
+    with reservations_lock:
+        reservation = reservations.get(port)
+        return reservation is not None and reservation.pid == os.getpid()
+
+
+def is_port_conflicted(bootlog):
+    """Returns True if mysqld failed to launch because its port is already in use"""
+    return bool(PORT_CONFLICT.search(bootlog))
+
+
+def get_socket_path(base_dir, name='mysql.sock'):
+    """Returns the path of the UNIX socket file under ``base_dir`` (or None if it is too long)"""
+    path = os.path.join(base_dir, 'tmp', name)
+    if len(path.encode('utf-8')) <= MAX_SOCKET_PATH:
+        return path
+    else:
+        return None
+
+
+def create_socket_directory():
+    """Creates a directory for the UNIX socket file with short path"""
+    for parent in ('/tmp', tempfile.gettempdir()):
+        try:
+            return tempfile.mkdtemp(prefix='mysqld.', dir=parent)
+        except (IOError, OSError):
+            pass
+
+    raise RuntimeError("could not create a directory for the socket file")
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import copy
+import threading
+
+from testing.mysqld.network import release_port, reserve_port
+
+
+class StartupError(RuntimeError):
+    """Raised when some of servers started in parallel failed to launch.
+
+    ``errors`` maps the index of each failed server to its exception.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        messages = ['#%d: %s' % (i, exc) for i, exc in sorted(errors.items())]
+        super(StartupError, self).__init__('failed to launch %d server(s):\n%s' % (len(errors), '\n'.join(messages)))
+
+
+def allocate_ports(n):
+    """Returns ``n`` distinct unused ports; they are reserved until the servers using them are stopped"""
+    return [reserve_port() for _ in range(n)]
+
+
+def run_concurrently(func, items, max_workers=None):
+    """Calls ``func(item)`` for each item in threads; returns exceptions raised (index -> exception)"""
+    items = list(items)
+    errors = {}
+    semaphore = threading.Semaphore(max_workers or len(items) or 1)
+
+    def run(i, item):
+        with semaphore:
+            try:
+                func(item)
+            except Exception as exc:
+                errors[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i, item)) for i, item in enumerate(items)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return errors
+
+
+def get_instance_settings(n, settings):
+    """Returns copies of ``settings`` for ``n`` servers; each of them gets its own port"""
+    if n > 1 and settings.get('base_dir'):
+        raise ValueError("base_dir can not be shared between servers")
+
+    my_cnf = settings.get('my_cnf') or {}
+    if n > 1 and 'port' in my_cnf:
+        raise ValueError("port can not be shared between servers")
+    if 'port' not in my_cnf and 'skip-networking' not in my_cnf:
+        ports = allocate_ports(n)
+    else:
+        ports = None
+
+    instance_settings = []
+    for i in range(n):
+        params = copy.deepcopy(settings)
+        if ports:
+            params['my_cnf'] = dict(my_cnf, port=ports[i])
+        instance_settings.append(params)
+
+    return instance_settings
+
+
+def start_many(target, n, settings, max_workers=None):
+    """Creates ``n`` servers with ``target(**settings)`` concurrently.
+
+    Each server gets its own copy of ``settings`` and its own port (unless
+    networking is disabled).  If any of them fails, the others are stopped
+    and ``StartupError`` is raised.
+    """
+    instance_settings = get_instance_settings(n, settings)
+    servers = [None] * n
+
+    def launch(i):
+        servers[i] = target(**instance_settings[i])
+
+    errors = run_concurrently(launch, range(n), max_workers)
+    if errors:
+        for server in servers:
+            if server is not None:
+                server.stop()
+        for params in instance_settings:
+            port = (params.get('my_cnf') or {}).get('port')
+            if port:
+                release_port(port)  # reservations of the servers failed to launch
+        raise StartupError(errors)
+
+    return servers
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+from time import time
+from contextlib import closing
+
+from testing.mysqld import MysqldFactory
+
+try:
+    from queue import Queue, Empty
+except ImportError:  # py2
+    from Queue import Queue, Empty
+
+SYSTEM_SCHEMAS = ('information_schema', 'mysql', 'performance_schema', 'sys')
+
+
+class PoolMetrics(object):
+    def __init__(self):
+        self.acquired = 0
+        self.hits = 0
+        self.misses = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, hit, wait):
+        with self._lock:
+            self.acquired += 1
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    @property
+    def hit_rate(self):
+        if self.acquired == 0:
+            return 0.0
+        return float(self.hits) / self.acquired
+
+    @property
+    def mean_wait(self):
+        if self.acquired == 0:
+            return 0.0
+        return self.total_wait / self.acquired
+
+    def as_dict(self):
+        return dict(acquired=self.acquired, hits=self.hits, misses=self.misses,
+                    hit_rate=self.hit_rate, mean_wait=self.mean_wait, max_wait=self.max_wait)
+
+
+class MysqldPool(object):
+    """Keeps ``size`` mysqld servers booted in background.
+
+    ``acquire()`` hands out an idle server, and ``release()`` resets it and
+    returns it to the pool asynchronously.  The server is reset by booting a
+    fresh one from the cached datadir (``reset='restart'``), or by dropping
+    all schemas and recreating ``test`` database (``reset='schemas'``; faster,
+    but fixtures created by ``on_initialized`` are also dropped).
+    """
+    DEFAULT_ACQUIRE_TIMEOUT = 60.0
+
+    def __init__(self, size=2, reset='restart', factory=None, **settings):
+        if reset not in ('restart', 'schemas'):
+            raise ValueError("unknown reset strategy: %s" % reset)
+
+        self._owns_factory = factory is None
+        if factory is None:
+            settings.setdefault('cache_initialized_db', True)
+            factory = MysqldFactory(**settings)
+
+        self.factory = factory
+        self.size = size
+        self.reset = reset
+        self.metrics = PoolMetrics()
+        self._closed = False
+        self._idle = Queue()
+        self._jobs = Queue()
+        self._instances = set()
+        self._lock = threading.Lock()
+
+        self._workers = []
+        for _ in range(size):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+            self._jobs.put((self._boot, ()))
+
+    def acquire(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("pool is already closed")
+
+        if timeout is None:
+            timeout = self.DEFAULT_ACQUIRE_TIMEOUT
+
+        started_at = time()
+        try:
+            mysqld = self._idle.get_nowait()
+            hit = True
+        except Empty:
+            hit = False
+            try:
+                mysqld = self._idle.get(timeout=timeout)
+            except Empty:
+                raise RuntimeError("*** failed to acquire mysqld from pool (timeout) ***")
+
+        if isinstance(mysqld, Exception):
+            self._jobs.put((self._boot, ()))  # retry
+            raise RuntimeError("failed to launch mysqld in pool: %r" % mysqld)
+
+        self.metrics.record(hit, time() - started_at)
+        return mysqld
+
+    def release(self, mysqld):
+        if self.reset == 'schemas':
+            self._jobs.put((self._reset_schemas, (mysqld,)))
+        else:
+            self._jobs.put((self._replace, (mysqld,)))
+
+    def close(self):
+        self._closed = True
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+
+        with self._lock:
+            instances, self._instances = self._instances, set()
+        for mysqld in instances:
+            mysqld.stop()
+
+        if self._owns_factory:
+            self.factory.clear_cache()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            func, args = job
+            try:
+                func(*args)
+            except Exception:
+                pass  # keep the worker alive for following jobs
+
+    def _boot(self):
+        if self._closed:
+            return
+
+        try:
+            mysqld = self.factory()
+        except Exception as exc:
+            self._idle.put(exc)
+        else:
+            with self._lock:
+                self._instances.add(mysqld)
+            self._idle.put(mysqld)
+
+    def _discard(self, mysqld):
+        with self._lock:
+            self._instances.discard(mysqld)
+        mysqld.stop()
+
+    def _replace(self, mysqld):
+        try:
+            self._discard(mysqld)
+        finally:
+            self._boot()  # keep the size of pool even if the server failed to stop
+
+    def _reset_schemas(self, mysqld):
+        if self._closed:
+            return
+
+        try:
+            reset_schemas(mysqld)
+        except Exception:
+            self._replace(mysqld)
+        else:
+            self._idle.put(mysqld)
+
+
+def reset_schemas(mysqld):
+    with mysqld.pool().connection() as conn:
+        with closing(conn.cursor()) as cursor:
+            cursor.execute('SHOW DATABASES')
+            for (name,) in cursor.fetchall():
+                if name not in SYSTEM_SCHEMAS:
+                    cursor.execute('DROP DATABASE `%s`' % name)
+            cursor.execute('CREATE DATABASE test')
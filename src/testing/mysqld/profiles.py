@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import tempfile
+
+from testing.mysqld.cache import get_directory_size
+
+DEFAULT_TMPFS_DIR = '/dev/shm'
+
+# estimated size of initialized datadir (with small redo logs)
+DEFAULT_DATADIR_SIZE = 256 * 1024 * 1024
+
+
+def get_profile_settings(profile, flavor, version, on_tmpfs=False):
+    """Returns my.cnf settings for the profile adjusted to the server version.
+
+    ``fast`` profile turns off durability of InnoDB and binary logging; the
+    server gets faster, but the data will be lost on crash.
+    """
+    if profile is None:
+        return {}
+    elif profile != 'fast':
+        raise ValueError("unknown profile: %s" % profile)
+
+    settings = {'innodb_flush_log_at_trx_commit': '0',
+                'sync_binlog': '0',
+                'innodb_doublewrite': '0',
+                'innodb_buffer_pool_size': '32M',
+                'performance_schema': 'OFF'}
+
+    if flavor == 'mysql' and version >= (8, 0, 30):
+        settings['innodb_redo_log_capacity'] = '8M'
+    else:
+        settings['innodb_log_file_size'] = '8M'
+
+    if flavor == 'mysql' and version >= (8, 0):
+        settings['skip-log-bin'] = None  # binary log is enabled by default since MySQL 8.0
+
+    if on_tmpfs:
+        settings['innodb_use_native_aio'] = '0'  # tmpfs does not support O_DIRECT
+
+    return settings
+
+
+# target RSS of each footprint (approximate; depends on the version and the workload)
+FOOTPRINTS = {'minimal': 64 * 1024 * 1024,
+              'small': 160 * 1024 * 1024}
+
+
+def get_footprint_settings(footprint, flavor, version):
+    """Returns my.cnf settings to fit the server into the target RSS of the footprint.
+
+    ``minimal`` shrinks buffers, caches and background threads to their minimum;
+    ``small`` keeps moderate buffers for tests handling some amount of data.
+    Options which might not exist in the version are prefixed with ``loose-``.
+    """
+    if footprint is None:
+        return {}
+    elif footprint not in FOOTPRINTS:
+        raise ValueError("unknown footprint: %s" % footprint)
+
+    if footprint == 'minimal':
+        settings = {'innodb_buffer_pool_size': '5M',
+                    'innodb_log_buffer_size': '1M',
+                    'key_buffer_size': '8',
+                    'max_connections': '20',
+                    'table_open_cache': '64',
+                    'table_definition_cache': '400',
+                    'thread_cache_size': '0',
+                    'tmp_table_size': '1M',
+                    'max_heap_table_size': '1M',
+                    'sort_buffer_size': '32K',
+                    'innodb_sort_buffer_size': '64K',
+                    'innodb_ft_cache_size': '1600000',
+                    'innodb_ft_total_cache_size': '32000000'}
+    else:
+        settings = {'innodb_buffer_pool_size': '32M',
+                    'innodb_log_buffer_size': '4M',
+                    'key_buffer_size': '1M',
+                    'max_connections': '50',
+                    'table_open_cache': '256',
+                    'tmp_table_size': '4M',
+                    'max_heap_table_size': '4M'}
+
+    settings.update({'performance_schema': 'OFF',
+                     'innodb_read_io_threads': '1',
+                     'innodb_write_io_threads': '1',
+                     'innodb_purge_threads': '1'})
+
+    if flavor == 'mysql' and version >= (8, 0, 30):
+        settings['innodb_redo_log_capacity'] = '8M'
+    else:
+        settings['innodb_log_file_size'] = '4M'
+
+    if flavor == 'mysql':
+        settings['loose-innodb_page_cleaners'] = '1'
+        if version >= (8, 0):
+            settings['mysqlx'] = 'OFF'  # X Plugin runs its own threads and buffers
+            settings['loose-temptable_max_ram'] = '2M' if footprint == 'minimal' else '16M'
+    else:
+        settings['loose-aria_pagecache_buffer_size'] = '1M' if footprint == 'minimal' else '8M'
+
+    return settings
+
+
+def get_read_only_settings(flavor, version, tmpdir):
+    """Returns my.cnf settings to run the server over a datadir shared with other servers.
+
+    Nothing is written to the datadir; InnoDB and the server are made read-only,
+    and files created at runtime are placed in ``tmpdir`` of each server.
+    """
+    if flavor == 'mariadb':
+        raise RuntimeError("read_only mode is not supported on MariaDB (Aria logs can not be shared)")
+
+    settings = {'innodb_read_only': 'ON',
+                'read_only': 'ON',
+                'loose-super_read_only': 'ON',
+                'loose-innodb_buffer_pool_dump_at_shutdown': 'OFF',
+                'loose-innodb_buffer_pool_load_at_startup': 'OFF'}
+
+    if flavor == 'mysql' and version >= (8, 0):
+        settings['skip-log-bin'] = None  # binary log is enabled by default since MySQL 8.0
+        if version >= (8, 0, 13):
+            settings['innodb_temp_tablespaces_dir'] = os.path.join(tmpdir, '#innodb_temp')
+
+    return settings
+
+
+def get_option_name(key):
+    """Normalizes the name of option (``loose-`` prefix, dashes and underscores)"""
+    if key.startswith('loose-') or key.startswith('loose_'):
+        key = key[6:]
+    return key.replace('-', '_')
+
+
+def get_rss(pid):
+    """Returns resident set size of the process in bytes (or None if unavailable)"""
+    try:
+        with open('/proc/%d/status' % pid) as fd:
+            for line in fd:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024  # in kB
+    except (IOError, OSError, TypeError, ValueError):
+        pass
+
+    return None
+
+
+def get_free_space(path):
+    try:
+        stat = os.statvfs(path)
+        return stat.f_bavail * stat.f_frsize
+    except (AttributeError, OSError):  # Windows or not mounted
+        return 0
+
+
+def create_tmpfs_directory(tmpfs_dir=None, copy_data_from=None):
+    """Creates a directory on tmpfs if it has enough space for datadir; otherwise returns None"""
+    tmpfs_dir = tmpfs_dir or DEFAULT_TMPFS_DIR
+    if copy_data_from:
+        required = get_directory_size(copy_data_from) * 2
+    else:
+        required = DEFAULT_DATADIR_SIZE
+
+    if get_free_space(tmpfs_dir) < required:
+        return None
+
+    return tempfile.mkdtemp(prefix='testing.mysqld.', dir=tmpfs_dir)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import pymysql
+from time import time
+from contextlib import closing, contextmanager
+from collections import OrderedDict
+
+# my.cnf settings to capture slow queries into mysql.slow_log table
+SLOW_QUERY_LOG_SETTINGS = {'slow_query_log': 'ON',
+                           'log_output': 'TABLE',
+                           'long_query_time': '0.1'}
+
+
+class Timings(object):
+    """Total elapsed time of each lifecycle phase (in seconds, in order of first appearance)"""
+
+    def __init__(self):
+        self.phases = OrderedDict()
+
+    def add(self, name, elapsed):
+        self.phases[name] = self.phases.get(name, 0) + elapsed
+
+    @contextmanager
+    def measure(self, name):
+        started_at = time()
+        try:
+            yield
+        finally:
+            self.add(name, time() - started_at)
+
+    def get(self, name):
+        return self.phases.get(name)
+
+    def as_dict(self):
+        return OrderedDict(self.phases)
+
+    def __repr__(self):
+        return '<Timings %s>' % ' '.join('%s=%.3fs' % item for item in self.phases.items())
+
+
+class StatsCollector(object):
+    """Gathers statistics of the server since the last start.
+
+    ``start()`` takes the baseline of ``SHOW GLOBAL STATUS``; ``collect()``
+    returns the changed status variables, slow queries and the top statement
+    digests of performance_schema (if enabled).
+    """
+    TOP = 10
+
+    def __init__(self, mysqld):
+        self.mysqld = mysqld
+        self.baseline = {}
+
+    def start(self):
+        with closing(self.mysqld.connection().cursor()) as cursor:
+            self.baseline = get_status(cursor)
+
+    def collect(self):
+        with closing(self.mysqld.connection().cursor()) as cursor:
+            return OrderedDict([('status', get_status_delta(self.baseline, get_status(cursor))),
+                                ('slow_queries', get_slow_queries(cursor, self.TOP)),
+                                ('digests', get_digests(cursor, self.TOP))])
+
+
+def get_status(cursor):
+    cursor.execute('SHOW GLOBAL STATUS')
+    status = {}
+    for name, value in cursor.fetchall():
+        try:
+            status[name] = int(value)
+        except (TypeError, ValueError):
+            pass  # not a counter
+
+    return status
+
+
+def get_status_delta(before, after):
+    delta = OrderedDict()
+    for name in sorted(after):
+        difference = after[name] - before.get(name, 0)
+        if difference:
+            delta[name] = difference
+
+    return delta
+
+
+def decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def get_slow_queries(cursor, limit):
+    try:
+        cursor.execute("SELECT TIME_TO_SEC(query_time), rows_sent, rows_examined, db, sql_text "
+                       "FROM mysql.slow_log ORDER BY query_time DESC LIMIT %d" % limit)
+    except pymysql.err.MySQLError:
+        return []  # slow_log table is not available
+
+    return [OrderedDict([('query_time', float(query_time)),
+                         ('rows_sent', rows_sent),
+                         ('rows_examined', rows_examined),
+                         ('db', decode(db)),
+                         ('sql_text', decode(sql_text))])
+            for query_time, rows_sent, rows_examined, db, sql_text in cursor.fetchall()]
+
+
+def get_digests(cursor, limit):
+    try:
+        cursor.execute("SELECT SCHEMA_NAME, DIGEST_TEXT, COUNT_STAR, SUM_TIMER_WAIT, SUM_ROWS_EXAMINED "
+                       "FROM performance_schema.events_statements_summary_by_digest "
+                       "WHERE DIGEST_TEXT IS NOT NULL ORDER BY SUM_TIMER_WAIT DESC LIMIT %d" % limit)
+    except pymysql.err.MySQLError:
+        return []  # performance_schema is not available
+
+    return [OrderedDict([('db', decode(schema)),
+                         ('digest_text', decode(digest_text)),
+                         ('count', int(count)),
+                         ('total_time', int(timer_wait) / 1e12),  # picoseconds -> seconds
+                         ('rows_examined', int(rows_examined))])
+            for schema, digest_text, count, timer_wait, rows_examined in cursor.fetchall()]
+
+
+def write_report(path, report):
+    """Appends the report to the file as a line of JSON (the file can be shared by servers)"""
+    with open(path, 'a') as fd:
+        fd.write(json.dumps(report) + '\n')
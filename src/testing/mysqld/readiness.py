@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import socket
+
+READY_MESSAGE = b'ready for connections'
+PROTOCOL_VERSION = b'\x0a'  # the first byte of initial handshake packet (protocol v10)
+
+
+class BootlogWatcher(object):
+    """Tails the error log of mysqld incrementally to find the message of readiness"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.tail = b''
+        self.ready = False
+
+    def poll(self):
+        if self.ready:
+            return True
+
+        try:
+            with open(self.path, 'rb') as fd:
+                fd.seek(self.offset)
+                data = fd.read()
+        except (IOError, OSError):
+            return False  # not created yet
+
+        self.offset += len(data)
+        lines = (self.tail + data).split(b'\n')
+        self.tail = lines.pop()  # incomplete line
+        for line in lines:
+            # X Plugin also reports "ready for connections"; the server itself reports its version
+            if READY_MESSAGE in line and b'X Plugin' not in line:
+                self.ready = True
+
+        return self.ready
+
+
+def probe_server(unix_socket=None, host=None, port=None, timeout=1.0):
+    """Returns True if the server sends initial handshake packet"""
+    if unix_socket and hasattr(socket, 'AF_UNIX'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = unix_socket
+    elif port:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = (host or '127.0.0.1', port)
+    else:
+        return False
+
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        header = b''
+        while len(header) < 5:  # 4 bytes of packet header + protocol version
+            data = sock.recv(5 - len(header))
+            if not data:
+                return False
+            header += data
+
+        return header[4:5] == PROTOCOL_VERSION
+    except (socket.error, OSError):
+        return False
+    finally:
+        sock.close()
+
+
+def probe_mysqld(mysqld, timeout=1.0):
+    if os.name != 'nt':
+        return probe_server(unix_socket=mysqld.my_cnf['socket'], timeout=timeout)
+    else:
+        return probe_server(host=mysqld.my_cnf.get('bind-address'), port=mysqld.my_cnf.get('port'),
+                            timeout=timeout)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import copy
+from glob import glob
+from contextlib import closing
+
+from testing.mysqld import Mysqld, find_program, get_server_version, parse_server_version
+from testing.mysqld.parallel import StartupError, allocate_ports, run_concurrently
+
+REPLICATION_USER = 'repl'
+REPLICATION_PASSWORD = 'repl'
+
+
+def get_node_settings(server_id, flavor, version):
+    settings = {'server-id': server_id,
+                'log-bin': 'mysql-bin',
+                'relay-log': 'relay-bin'}
+
+    if flavor == 'mysql':
+        settings['gtid_mode'] = 'ON'
+        settings['enforce_gtid_consistency'] = 'ON'
+        if version >= (8, 0, 26):
+            settings['log_replica_updates'] = 'ON'
+        else:
+            settings['log-slave-updates'] = None
+    else:
+        settings['log-slave-updates'] = None  # GTID is always enabled on MariaDB
+
+    return settings
+
+
+class MysqldReplicaSet(object):
+    """A primary server and its replicas connected by GTID based replication.
+
+    Replicas are cloned from the initialized datadir of the primary (instead
+    of initializing each one), and all servers are booted concurrently.
+    """
+    DEFAULT_CATCHUP_TIMEOUT = 10.0
+
+    def __init__(self, replicas=1, **settings):
+        if 'skip-networking' in (settings.get('my_cnf') or {}):
+            raise ValueError("replication requires networking")
+        if settings.get('base_dir'):
+            raise ValueError("base_dir can not be shared between servers")
+        if settings.get('read_only'):
+            raise ValueError("replication requires writable datadir")
+
+        mysqld = settings.get('mysqld') or find_program('mysqld', ['bin', 'libexec', 'sbin'])
+        self.flavor, self.version = parse_server_version(get_server_version(mysqld))
+        self.primary = None
+        self.replicas = []
+
+        ports = allocate_ports(replicas + 1)
+        node_settings = [self.get_settings(settings, i + 1, ports[i]) for i in range(replicas + 1)]
+        try:
+            self.primary = Mysqld(**node_settings[0])
+            self.setup_primary()
+
+            for params in node_settings[1:]:
+                params.update(auto_start=0, copy_data_from=self.primary.get_data_directory())
+                self.replicas.append(Mysqld(**params))
+
+            errors = run_concurrently(self.setup_replica, self.replicas)
+            if errors:
+                raise StartupError(dict((i + 1, exc) for i, exc in errors.items()))
+
+            self.primary.start()
+            errors = run_concurrently(lambda replica: replica.start(), self.replicas)
+            if errors:
+                raise StartupError(dict((i + 1, exc) for i, exc in errors.items()))
+
+            for replica in self.replicas:
+                self.start_replication(replica)
+        except Exception:
+            self.stop()
+            raise
+
+    def get_settings(self, settings, server_id, port):
+        params = copy.deepcopy(settings)
+        params['my_cnf'] = dict(params.get('my_cnf') or {}, port=port)
+        for key, value in get_node_settings(server_id, self.flavor, self.version).items():
+            params['my_cnf'].setdefault(key, value)
+
+        return params
+
+    @property
+    def nodes(self):
+        return [node for node in [self.primary] + self.replicas if node is not None]
+
+    def query(self, mysqld, *statements):
+        with closing(mysqld.connection().cursor()) as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            return cursor.fetchall()
+
+    def setup_primary(self):
+        if self.flavor == 'mysql' and self.version >= (8, 2):
+            reset = "RESET BINARY LOGS AND GTIDS"
+        else:
+            reset = "RESET MASTER"
+
+        self.query(self.primary,
+                   "CREATE USER '%s'@'%%' IDENTIFIED BY '%s'" % (REPLICATION_USER, REPLICATION_PASSWORD),
+                   "GRANT REPLICATION SLAVE ON *.* TO '%s'@'%%'" % REPLICATION_USER,
+                   reset)
+        self.primary.terminate()  # keep datadir to clone
+
+    def setup_replica(self, replica):
+        replica.setup()
+
+        # replicas must not share server_uuid and binary logs with the primary
+        data_dir = replica.get_data_directory()
+        for path in [os.path.join(data_dir, 'auto.cnf')] + glob(os.path.join(data_dir, 'mysql-bin.*')):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def start_replication(self, replica):
+        options = dict(HOST="'127.0.0.1'",
+                       PORT=self.primary.my_cnf['port'],
+                       USER="'%s'" % REPLICATION_USER,
+                       PASSWORD="'%s'" % REPLICATION_PASSWORD)
+        if self.flavor == 'mariadb':
+            statement = "CHANGE MASTER TO %s, MASTER_USE_GTID=slave_pos"
+            prefix = 'MASTER_'
+            start = "START SLAVE"
+        elif self.version >= (8, 0, 23):
+            options.update(AUTO_POSITION=1, PUBLIC_KEY=1)
+            statement = "CHANGE REPLICATION SOURCE TO %s"
+            prefix = 'SOURCE_'
+            start = "START REPLICA"
+        else:
+            options.update(AUTO_POSITION=1)
+            if self.version >= (8, 0):
+                options.update(PUBLIC_KEY=1)
+            statement = "CHANGE MASTER TO %s"
+            prefix = 'MASTER_'
+            start = "START SLAVE"
+
+        # GET_MASTER_PUBLIC_KEY / GET_SOURCE_PUBLIC_KEY is named differently from others
+        params = []
+        for key, value in sorted(options.items()):
+            if key == 'PUBLIC_KEY':
+                params.append('GET_%s%s=%s' % (prefix, key, value))
+            else:
+                params.append('%s%s=%s' % (prefix, key, value))
+        self.query(replica, statement % ', '.join(params), start)
+
+    def wait_for_replica_catchup(self, timeout=None):
+        """Waits until all replicas apply the transactions executed on the primary"""
+        if timeout is None:
+            timeout = self.DEFAULT_CATCHUP_TIMEOUT
+
+        if self.flavor == 'mariadb':
+            position = self.query(self.primary, "SELECT @@GLOBAL.gtid_binlog_pos")[0][0]
+            wait = "SELECT MASTER_GTID_WAIT('%s', %f) = 0" % (position, timeout)
+        else:
+            position = self.query(self.primary, "SELECT @@GLOBAL.gtid_executed")[0][0].replace('\n', '')
+            if self.version >= (5, 7, 5):
+                wait = "SELECT WAIT_FOR_EXECUTED_GTID_SET('%s', %f) = 0" % (position, timeout)
+            else:
+                wait = "SELECT WAIT_UNTIL_SQL_THREAD_AFTER_GTIDS('%s', %d) >= 0" % (position, max(timeout, 1))
+
+        for i, replica in enumerate(self.replicas):
+            if not self.query(replica, wait)[0][0]:
+                raise RuntimeError("*** replica #%d did not catch up with primary (timeout) ***" % (i + 1))
+
+    def stop(self):
+        for node in self.nodes:
+            node.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
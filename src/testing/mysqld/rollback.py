@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+import warnings
+from contextlib import closing, contextmanager
+from pymysql.connections import Connection
+from pymysql.err import NotSupportedError
+from pymysql.cursors import Cursor
+
+from testing.mysqld.schema import copy_tables, quote
+
+SAVEPOINT = 'testing_mysqld_savepoint'
+
+# statements causing an implicit commit (except for temporary tables)
+IMPLICIT_COMMIT = re.compile(r'^\s*(ALTER|CREATE|DROP|RENAME|TRUNCATE|GRANT|REVOKE|'
+                             r'LOCK\s+TABLES?|UNLOCK\s+TABLES?|SET\s+PASSWORD|ANALYZE|OPTIMIZE|REPAIR|'
+                             r'CACHE\s+INDEX|LOAD\s+INDEX|FLUSH|RESET|INSTALL|UNINSTALL)\b', re.I)
+TEMPORARY_TABLE = re.compile(r'^\s*(CREATE|DROP)\s+TEMPORARY\s+TABLE\b', re.I)
+TRANSACTION_CONTROL = re.compile(r'^\s*(BEGIN|START\s+TRANSACTION(?:\s+(?:READ\s+ONLY|READ\s+WRITE|'
+                                 r'WITH\s+CONSISTENT\s+SNAPSHOT)\s*,?)*|COMMIT|ROLLBACK)(?:\s+WORK)?'
+                                 r'(?:\s+AND\s+(?:NO\s+)?CHAIN)?(\s+(NO\s+)?RELEASE)?\s*;?\s*$', re.I)
+AUTOCOMMIT = re.compile(r'^\s*SET\s+(?:@@(?:SESSION\.|LOCAL\.)?|SESSION\s+|LOCAL\s+)?autocommit\s*:?=\s*'
+                        r"'?(\w+)'?\s*;?\s*$", re.I)
+SETS_AUTOCOMMIT = re.compile(r'^\s*SET\b.*\bautocommit\b', re.I | re.S)
+
+
+class ImplicitCommitWarning(UserWarning):
+    pass
+
+
+class RollbackConnection(Connection):
+    """pymysql connection whose transaction control is replaced by savepoints of RollbackSession.
+
+    All statements (via cursors or ``query()``) are inspected; ``COMMIT``, ``ROLLBACK``
+    and ``SET autocommit`` are translated into savepoints, and statements causing an
+    implicit commit are reported to the session.
+    """
+    session = None
+    guarded = True
+
+    def query(self, sql, unbuffered=False):
+        if self.session is None or not self.guarded:
+            return super(RollbackConnection, self).query(sql, unbuffered)
+
+        if isinstance(sql, bytes):
+            statement = sql.decode(self.encoding, 'replace')
+        else:
+            statement = sql
+
+        matched = TRANSACTION_CONTROL.match(statement)
+        if matched:
+            if matched.group(2) and not matched.group(3):
+                raise NotSupportedError("RELEASE would close the connection of rollback session: %s" % statement)
+            elif matched.group(1).upper() == 'ROLLBACK':
+                sql = 'ROLLBACK TO SAVEPOINT %s' % SAVEPOINT
+            else:
+                sql = 'SAVEPOINT %s' % SAVEPOINT
+            return super(RollbackConnection, self).query(sql, unbuffered)
+
+        matched = AUTOCOMMIT.match(statement)
+        if matched:
+            if matched.group(1).upper() in ('1', 'ON', 'TRUE'):
+                sql = 'SAVEPOINT %s' % SAVEPOINT  # commits; the outer transaction is kept
+            return super(RollbackConnection, self).query(sql, unbuffered)
+
+        sets_autocommit = SETS_AUTOCOMMIT.match(statement)
+        if sets_autocommit or (IMPLICIT_COMMIT.match(statement) and not TEMPORARY_TABLE.match(statement)):
+            try:
+                return super(RollbackConnection, self).query(sql, unbuffered)
+            finally:
+                if sets_autocommit:
+                    self.autocommit(False)
+                self.session.implicit_commit(statement)
+
+        return super(RollbackConnection, self).query(sql, unbuffered)
+
+    def autocommit(self, value):
+        super(RollbackConnection, self).autocommit(False)  # keep the outer transaction
+
+    def begin(self):
+        self.commit()
+
+    def commit(self):
+        self.query('SAVEPOINT %s' % SAVEPOINT)
+
+    def rollback(self):
+        self.query('ROLLBACK TO SAVEPOINT %s' % SAVEPOINT)
+
+    @contextmanager
+    def unguarded(self):
+        self.guarded = False
+        try:
+            yield
+        finally:
+            self.guarded = True
+
+
+class RollbackSession(object):
+    """Wraps all work on the connection in a transaction; rolled back by ``reset()``.
+
+    ``commit()`` and ``rollback()`` on the connection (and ``COMMIT``, ``ROLLBACK``
+    and ``SET autocommit=1`` statements) are turned into savepoints.
+    When a statement causes an implicit commit (DDL and so on), the schema is
+    restored from ``template`` schema on ``reset()`` instead; it is reported
+    through ``ImplicitCommitWarning`` and ``fallbacks`` attribute.
+    """
+
+    def __init__(self, mysqld, db='test', template=None, **kwargs):
+        self.mysqld = mysqld
+        self.db = db
+        self.template = template
+        self.fallbacks = []
+        self.resets = dict(rollback=0, schema=0)
+        self.dirty = False
+
+        params = mysqld.dsn(db=db, **kwargs)
+        params['autocommit'] = False
+        self.connection = RollbackConnection(**params)
+        self.connection.session = self
+        self.begin()
+
+    def begin(self):
+        Connection.begin(self.connection)
+        self.connection.query('SAVEPOINT %s' % SAVEPOINT)
+
+    def implicit_commit(self, statement):
+        self.dirty = True
+        self.fallbacks.append(statement)
+        warnings.warn("statement caused an implicit commit; %s will be reset by schema: %s" % (self.db, statement),
+                      ImplicitCommitWarning, stacklevel=3)
+
+        # the outer transaction is finished; start new one to keep savepoint semantics
+        self.begin()
+
+    def rollback(self):
+        Connection.rollback(self.connection)
+        if self.dirty:
+            self.reset_schema()
+            self.resets['schema'] += 1
+            self.dirty = False
+        else:
+            self.resets['rollback'] += 1
+
+    def reset(self):
+        self.rollback()
+        self.begin()
+
+    def reset_schema(self):
+        with self.connection.unguarded(), closing(Cursor(self.connection)) as cursor:
+            cursor.execute('DROP DATABASE IF EXISTS %s' % quote(self.db))
+            cursor.execute('CREATE DATABASE %s' % quote(self.db))
+            if self.template:
+                copy_tables(cursor, self.template, self.db)
+            cursor.execute('USE %s' % quote(self.db))
+        Connection.commit(self.connection)
+
+    def url(self, **kwargs):
+        kwargs.setdefault('db', self.db)
+        return self.mysqld.url(**kwargs)
+
+    def create_engine(self, **kwargs):
+        """Returns SQLAlchemy engine which always uses the connection of this session"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import StaticPool
+
+        return create_engine(self.url(), creator=lambda: self.connection, poolclass=StaticPool, **kwargs)
+
+    def close(self):
+        if self.connection.open:
+            self.rollback()
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def create_template(mysqld, db, template):
+    with mysqld.pool().connection() as conn:
+        with closing(conn.cursor()) as cursor:
+            cursor.execute('DROP DATABASE IF EXISTS %s' % quote(template))
+            cursor.execute('CREATE DATABASE %s' % quote(template))
+            copy_tables(cursor, db, template)
+        conn.commit()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import uuid
+import pymysql
+import threading
+from contextlib import closing
+
+try:
+    from queue import Queue
+except ImportError:  # py2
+    from Queue import Queue
+
+
+def quote(name):
+    return '`%s`' % name.replace('`', '``')
+
+
+class IsolatedDatabase(object):
+    """A uniquely named schema on the shared server; dropped on exit."""
+
+    def __init__(self, mysqld, name=None, template=None, prefix='test_'):
+        self.mysqld = mysqld
+        self.name = name or prefix + uuid.uuid4().hex[:16]
+        self.template = template
+        self.dropped = False
+
+    def create(self):
+        with self.mysqld.pool().connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('CREATE DATABASE %s' % quote(self.name))
+                if self.template:
+                    copy_tables(cursor, self.template, self.name)
+            conn.commit()
+
+    def dsn(self, **kwargs):
+        kwargs.setdefault('db', self.name)
+        return self.mysqld.dsn(**kwargs)
+
+    def url(self, **kwargs):
+        kwargs.setdefault('db', self.name)
+        return self.mysqld.url(**kwargs)
+
+    def drop(self, wait=False):
+        if self.dropped:
+            return
+
+        self.dropped = True
+        if wait:
+            drop_database(self.mysqld, self.name)
+        else:
+            self.mysqld.schema_dropper.put(self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.drop()
+
+
+def copy_tables(cursor, source, destination):
+    """Copies tables (with rows), views and triggers of ``source`` schema to ``destination``
+
+    Tables are recreated from ``SHOW CREATE TABLE`` because ``CREATE TABLE ... LIKE``
+    drops their foreign keys.
+    """
+    cursor.execute("SELECT table_name FROM information_schema.tables "
+                   "WHERE table_schema = %s AND table_type = 'BASE TABLE'", (source,))
+    tables = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute('SET foreign_key_checks = 0')
+    try:
+        for table in tables:
+            src = '%s.%s' % (quote(source), quote(table))
+            dst = '%s.%s' % (quote(destination), quote(table))
+            cursor.execute('SHOW CREATE TABLE %s' % src)
+            definition = cursor.fetchone()[1]
+            cursor.execute(definition.replace('CREATE TABLE ', 'CREATE TABLE %s.' % quote(destination), 1))
+            copy_rows(cursor, source, table, dst)
+    finally:
+        cursor.execute('SET foreign_key_checks = 1')
+
+    copy_views(cursor, source, destination)
+    copy_triggers(cursor, source, destination)
+
+
+def copy_rows(cursor, db, table, destination):
+    """Copies rows of ``db.table`` to ``destination`` table, except values of generated columns"""
+    cursor.execute("SELECT column_name FROM information_schema.columns "
+                   "WHERE table_schema = %s AND table_name = %s AND extra NOT LIKE '%%GENERATED%%' "
+                   "ORDER BY ordinal_position", (db, table))
+    columns = ', '.join(quote(row[0]) for row in cursor.fetchall())
+    source = '%s.%s' % (quote(db), quote(table))
+    cursor.execute('INSERT INTO %s (%s) SELECT %s FROM %s' % (destination, columns, columns, source))
+
+
+def copy_views(cursor, source, destination):
+    cursor.execute("SELECT table_name, view_definition, check_option, security_type "
+                   "FROM information_schema.views WHERE table_schema = %s", (source,))
+    views = cursor.fetchall()
+
+    # views might refer other views; create them in order of dependency
+    while views:
+        pending = []
+        for name, definition, check_option, security_type in views:
+            statement = 'CREATE SQL SECURITY %s VIEW %s.%s AS %s' % (
+                security_type, quote(destination), quote(name),
+                definition.replace(quote(source) + '.', quote(destination) + '.')
+            )
+            if check_option and check_option != 'NONE':
+                statement += ' WITH %s CHECK OPTION' % check_option
+            try:
+                cursor.execute(statement)
+            except pymysql.err.MySQLError:
+                pending.append((name, definition, check_option, security_type))
+
+        if len(pending) == len(views):
+            raise RuntimeError("failed to copy views: %s" % ', '.join(view[0] for view in pending))
+        views = pending
+
+
+def copy_triggers(cursor, source, destination):
+    cursor.execute("SELECT trigger_name, action_timing, event_manipulation, event_object_table, "
+                   "action_statement FROM information_schema.triggers "
+                   "WHERE trigger_schema = %s ORDER BY event_object_table, action_order", (source,))
+    for name, timing, event, table, statement in cursor.fetchall():
+        cursor.execute('CREATE TRIGGER %s.%s %s %s ON %s.%s FOR EACH ROW %s' % (
+            quote(destination), quote(name), timing, event, quote(destination), quote(table), statement
+        ))
+
+
+def drop_database(mysqld, name):
+    with mysqld.pool().connection() as conn:
+        with closing(conn.cursor()) as cursor:
+            cursor.execute('DROP DATABASE IF EXISTS %s' % quote(name))
+
+
+class SchemaDropper(object):
+    """Drops schemas in background thread to keep teardown of tests fast."""
+
+    def __init__(self, mysqld):
+        self.mysqld = mysqld
+        self.queue = Queue()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, name):
+        self.queue.put(name)
+
+    def run(self):
+        while True:
+            name = self.queue.get()
+            try:
+                if name is None:
+                    break
+
+                drop_database(self.mysqld, name)
+            except Exception:
+                pass  # the server might have been stopped already
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """Waits until all queued schemas are dropped"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""A mysqld shared between processes, brokered by a daemon.
+
+usage: python -m testing.mysqld.shared --directory DIR [--idle-timeout SECONDS]
+"""
+
+import os
+import sys
+import json
+import errno
+import select
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+from time import sleep, time
+from contextlib import contextmanager
+
+from testing.mysqld import Mysqld, build_url
+from testing.mysqld.cache import get_default_cache_dir
+from testing.mysqld.schema import IsolatedDatabase
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+DEFAULT_IDLE_TIMEOUT = 60.0
+DEFAULT_BOOT_TIMEOUT = 60.0  # including initialization of datadir
+DEFAULT_HELLO_TIMEOUT = 10.0
+
+
+def get_default_directory(name):
+    return os.path.join(get_default_cache_dir(), 'shared', name)
+
+
+@contextmanager
+def lock(directory, blocking=True):
+    """Locks the directory exclusively (between processes)
+
+    Yields False without locking if ``blocking`` is False and others hold the lock.
+    """
+    with open(os.path.join(directory, 'lock'), 'a') as fd:
+        if fcntl:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError) as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                yield False
+                return
+
+        try:
+            yield True
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def read_state(directory):
+    try:
+        with open(os.path.join(directory, 'state.json')) as fd:
+            return json.load(fd)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_state(directory, state):
+    path = os.path.join(directory, 'state.json')
+    with open(path + '.tmp', 'w') as fd:
+        json.dump(state, fd)
+    os.rename(path + '.tmp', path)
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Broker(object):
+    """Daemon running a mysqld and leasing isolated schemas on it over a unix socket.
+
+    Clients talk in lines of JSON.  Schemas leased by a client are dropped when
+    it releases them or disconnects, and the daemon stops the server after
+    ``idle_timeout`` seconds without clients.
+    """
+
+    def __init__(self, directory, settings=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, mysqld=None):
+        self.directory = directory
+        self.settings = settings or {}
+        self.idle_timeout = idle_timeout
+        self.mysqld = mysqld
+        self.socket_path = os.path.join(directory, 'broker.sock')
+        self.clients = {}  # socket -> dict(buffer, leases)
+        self.server = None
+
+    def run(self):
+        if self.mysqld is None:
+            self.mysqld = Mysqld(**self.settings)
+
+        try:
+            remove_file(self.socket_path)  # left by crashed daemon
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.socket_path)
+            self.server.listen(16)
+            write_state(self.directory, dict(pid=os.getpid(), socket=self.socket_path, dsn=self.mysqld.dsn()))
+
+            idle_since = time()
+            while True:
+                self.poll(1.0)
+                if self.clients:
+                    idle_since = time()
+                elif time() - idle_since > self.idle_timeout and self.shutdown():
+                    break
+        finally:
+            if self.server:
+                self.server.close()
+            for client in list(self.clients):
+                self.disconnect(client)
+            self.mysqld.stop()
+
+    def shutdown(self):
+        """Stops accepting clients unless a client has come just now"""
+        with lock(self.directory, blocking=False) as locked:
+            if not locked:
+                return False  # a client is attaching; it waits for the reply to hello
+
+            self.poll(0)
+            if self.clients:
+                return False
+
+            state = read_state(self.directory)
+            if state and state.get('pid') == os.getpid():
+                remove_file(os.path.join(self.directory, 'state.json'))
+            remove_file(self.socket_path)
+            return True
+
+    def poll(self, timeout):
+        readable = select.select([self.server] + list(self.clients), [], [], timeout)[0]
+        for sock in readable:
+            if sock is self.server:
+                client, _ = self.server.accept()
+                self.clients[client] = dict(buffer=b'', leases={})
+                continue
+
+            try:
+                data = sock.recv(4096)
+            except socket.error:
+                data = b''
+            if not data:
+                self.disconnect(sock)
+                continue
+
+            lines = (self.clients[sock]['buffer'] + data).split(b'\n')
+            self.clients[sock]['buffer'] = lines.pop()
+            try:
+                for line in lines:
+                    response = self.handle(sock, json.loads(line.decode('utf-8')))
+                    sock.sendall(json.dumps(response).encode('utf-8') + b'\n')
+            except Exception:  # malformed request, or the client has gone before the response
+                self.disconnect(sock)
+
+    def handle(self, client, request):
+        leases = self.clients[client]['leases']
+        try:
+            if request['op'] == 'hello':
+                return dict(pid=os.getpid(), dsn=self.mysqld.dsn())
+            elif request['op'] == 'lease':
+                database = IsolatedDatabase(self.mysqld, template=request.get('template'),
+                                            prefix=request.get('prefix') or 'test_')
+                database.create()
+                leases[database.name] = database
+                return dict(db=database.name)
+            elif request['op'] == 'release':
+                leases.pop(request['db']).drop()
+                return dict(db=request['db'])
+            else:
+                return dict(error='unknown operation: %s' % request['op'])
+        except Exception as exc:
+            return dict(error=repr(exc))
+
+    def disconnect(self, client):
+        try:
+            for database in self.clients.pop(client)['leases'].values():
+                try:
+                    database.drop()
+                except Exception:
+                    pass  # keep serving other clients
+        finally:
+            client.close()
+
+
+class LeasedDatabase(object):
+    """A schema leased from the shared server"""
+
+    def __init__(self, shared, name):
+        self.shared = shared
+        self.name = name
+        self.released = False
+
+    def dsn(self, **kwargs):
+        kwargs.setdefault('db', self.name)
+        return self.shared.dsn(**kwargs)
+
+    def url(self, **kwargs):
+        return build_url(self.dsn(**kwargs))
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.shared.request(op='release', db=self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class SharedMysqld(object):
+    """Client of the mysqld shared between processes.
+
+    The first client spawns the daemon (``Broker``) described by the state
+    file in ``directory``; others reattach to it.  Each client leases its
+    own schemas with ``lease()``.
+    """
+
+    def __init__(self, name='default', directory=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, **settings):
+        self.directory = directory or get_default_directory(name)
+        self.idle_timeout = idle_timeout
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+        self.server_dsn = None
+        self.broker_pid = None
+
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+
+        with lock(self.directory):
+            if not self.attach():
+                self.spawn()
+
+    def attach(self):
+        state = read_state(self.directory)
+        if state is None:
+            return False
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(state['socket'])
+        except socket.error:
+            sock.close()
+            return False  # the daemon has gone
+
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        try:
+            sock.settimeout(DEFAULT_HELLO_TIMEOUT)  # the daemon might be stuck or stopping
+            response = self.request(op='hello')
+            sock.settimeout(None)
+        except Exception:
+            self.close()
+            return False
+
+        self.broker_pid = response['pid']
+        self.server_dsn = response['dsn']
+        return True
+
+    def spawn(self):
+        command = [sys.executable, '-m', 'testing.mysqld.shared',
+                   '--directory', self.directory, '--idle-timeout', str(self.idle_timeout)]
+        with open(os.path.join(self.directory, 'broker.log'), 'ab') as logger:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=logger, stderr=logger,
+                                       close_fds=True, preexec_fn=os.setsid)
+        process.stdin.write(json.dumps(self.settings).encode('utf-8'))
+        process.stdin.close()
+
+        started_at = time()
+        while True:
+            state = read_state(self.directory)
+            if state and state.get('pid') == process.pid and self.attach():
+                break
+
+            if process.poll() is not None:
+                raise RuntimeError("*** failed to launch shared mysqld ***\n" + self.read_log())
+            if time() - started_at > DEFAULT_BOOT_TIMEOUT:
+                raise RuntimeError("*** failed to launch shared mysqld (timeout) ***\n" + self.read_log())
+
+            sleep(0.1)
+
+    def read_log(self):
+        try:
+            with open(os.path.join(self.directory, 'broker.log')) as fd:
+                return fd.read()
+        except (IOError, OSError):
+            return ''
+
+    def request(self, **request):
+        with self.lock:
+            if self.sock is None:
+                raise RuntimeError("not connected to shared mysqld")
+
+            self.sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            line = self.reader.readline()
+            if not line:
+                raise RuntimeError("shared mysqld has gone")
+
+        response = json.loads(line.decode('utf-8'))
+        if 'error' in response:
+            raise RuntimeError("shared mysqld: %s" % response['error'])
+        return response
+
+    def dsn(self, **kwargs):
+        params = dict(self.server_dsn)
+        params.update(kwargs)
+        return params
+
+    def url(self, **kwargs):
+        return build_url(self.dsn(**kwargs))
+
+    def lease(self, template=None, prefix='test_'):
+        """Creates a schema for this process; dropped on ``release()`` or exit of the process"""
+        response = self.request(op='lease', template=template, prefix=prefix)
+        return LeasedDatabase(self, response['db'])
+
+    def close(self):
+        """Disconnects from the daemon; leased schemas are dropped"""
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description='daemon sharing mysqld between processes')
+    parser.add_argument('--directory', required=True, help='directory for the lock and state files')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='seconds to keep the server without clients')
+    options = parser.parse_args(argv)
+
+    settings = json.loads(sys.stdin.read() or '{}')
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    Broker(options.directory, settings, options.idle_timeout).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import re
+from time import time
+from shutil import rmtree
+from contextlib import contextmanager
+
+from testing.mysqld.cache import get_directory_size
+from testing.mysqld.clone import DEFAULT_STRATEGIES, clone_directory, unmount_overlayfs
+
+SNAPSHOT_NAME = re.compile(r'^[\w.-]+$')
+
+
+class Snapshot(object):
+    def __init__(self, name, path, size, elapsed, strategy, rollback_templates=()):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.elapsed = elapsed
+        self.strategy = strategy
+        self.rollback_templates = set(rollback_templates)
+
+    def __repr__(self):
+        return ('<Snapshot name=%s size=%d strategy=%s elapsed=%.3fs>' %
+                (self.name, self.size, self.strategy, self.elapsed))
+
+
+class RestoreResult(object):
+    def __init__(self, snapshot, elapsed, strategy):
+        self.snapshot = snapshot
+        self.elapsed = elapsed
+        self.strategy = strategy
+
+    def __repr__(self):
+        return ('<RestoreResult name=%s strategy=%s elapsed=%.3fs>' %
+                (self.snapshot.name, self.strategy, self.elapsed))
+
+
+class SnapshotManager(object):
+    """Keeps named copies of the datadir of a Mysqld instance.
+
+    The server is stopped while its datadir is copied or replaced (to get
+    consistent InnoDB files) and started again afterwards.  Files are cloned
+    with reflinks or hardlinks if possible.
+    """
+
+    def __init__(self, mysqld):
+        self.mysqld = mysqld
+        self.snapshots = {}
+
+    @property
+    def directory(self):
+        return os.path.join(self.mysqld._ephemeral_dir or self.mysqld.base_dir, 'snapshots')
+
+    @property
+    def strategies(self):
+        # datadir must be writable without mounts to be replaced on restore
+        strategies = self.mysqld.settings['clone_strategies'] or DEFAULT_STRATEGIES
+        return [name for name in strategies if name != 'overlayfs']
+
+    def take(self, name):
+        if not SNAPSHOT_NAME.match(name):
+            raise ValueError("invalid snapshot name: %r" % name)
+
+        started_at = time()
+        path = os.path.join(self.directory, name)
+        with self.stopped():
+            if os.path.exists(path):
+                rmtree(path)
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+
+            try:
+                result = clone_directory(self.mysqld.get_data_directory(), path, self.strategies)
+            except Exception as exc:
+                rmtree(path, ignore_errors=True)
+                raise RuntimeError("could not take snapshot %s: %r" % (name, exc))
+
+        snapshot = Snapshot(name, path, get_directory_size(path), time() - started_at, result.strategy,
+                            self.mysqld._rollback_templates)
+        self.snapshots[name] = snapshot
+        return snapshot
+
+    def restore(self, name):
+        snapshot = self.snapshots.get(name)
+        if snapshot is None:
+            raise KeyError("snapshot not found: %s" % name)
+        if self.mysqld.read_only:
+            raise RuntimeError("could not restore snapshot %s: datadir is shared in read_only mode" % name)
+
+        started_at = time()
+        data_dir = self.mysqld.get_data_directory()
+        with self.stopped():
+            clone_result = getattr(self.mysqld, 'clone_result', None)
+            if clone_result and clone_result.strategy == 'overlayfs':
+                unmount_overlayfs(data_dir)
+                self.mysqld.clone_result = None
+            rmtree(data_dir, ignore_errors=True)
+
+            try:
+                result = clone_directory(snapshot.path, data_dir, self.strategies)
+                os.chmod(data_dir, 0o700)
+            except Exception as exc:
+                raise RuntimeError("could not restore snapshot %s: %r" % (name, exc))
+
+            self.mysqld._rollback_templates = set(snapshot.rollback_templates)
+
+        return RestoreResult(snapshot, time() - started_at, result.strategy)
+
+    def remove(self, name):
+        snapshot = self.snapshots.pop(name)
+        rmtree(snapshot.path, ignore_errors=True)
+
+    @contextmanager
+    def stopped(self):
+        """Stops the server (if running) in the block and starts it again (unless the block fails)"""
+        running = self.mysqld.child_process is not None
+        if running:
+            self.mysqld.terminate()
+
+        yield
+
+        if running:
+            self.mysqld.start()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#  Copyright 2013 Takeshi KOMIYA
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+import pymysql
+from time import time
+from contextlib import closing
+
+from testing.mysqld.schema import copy_rows, copy_tables, quote
+
+TABLES = ("SELECT TABLE_NAME FROM information_schema.TABLES "
+          "WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'")
+
+TABLE_STATISTICS = ("SELECT t.TABLE_NAME, t.CREATE_TIME, t.UPDATE_TIME, t.TABLE_ROWS, t.AUTO_INCREMENT, "
+                    "t.DATA_LENGTH%s FROM information_schema.TABLES t%s "
+                    "WHERE t.TABLE_SCHEMA = %%s AND t.TABLE_TYPE = 'BASE TABLE'")
+TABLE_IO_COUNTERS = (", io.COUNT_WRITE",
+                     " LEFT JOIN performance_schema.table_io_waits_summary_by_table io "
+                     "ON io.OBJECT_TYPE = 'TABLE' AND io.OBJECT_SCHEMA = t.TABLE_SCHEMA "
+                     "AND io.OBJECT_NAME = t.TABLE_NAME")
+AUTO_INCREMENT = re.compile(r' AUTO_INCREMENT=\d+')
+
+
+def get_definition(cursor, table):
+    """Returns ``CREATE TABLE`` statement of the table (or None if not exists)"""
+    try:
+        cursor.execute('SHOW CREATE TABLE %s' % table)
+    except pymysql.err.MySQLError:
+        return None
+
+    return AUTO_INCREMENT.sub('', cursor.fetchone()[1])
+
+
+class ChecksumTracker(object):
+    """Detects changes by ``CHECKSUM TABLE`` (exact, but reads all rows)"""
+    name = 'checksum'
+
+    def get_signatures(self, cursor, db, tables=None):
+        if tables is None:
+            cursor.execute(TABLES, (db,))
+            tables = [row[0] for row in cursor.fetchall()]
+        if not tables:
+            return {}
+
+        cursor.execute('CHECKSUM TABLE %s' % ', '.join('%s.%s' % (quote(db), quote(t)) for t in tables))
+        return dict((name.split('.', 1)[1], checksum) for name, checksum in cursor.fetchall()
+                    if checksum is not None)  # None if the table does not exist
+
+
+class StatisticsTracker(object):
+    """Detects changes by table statistics and write counters of performance_schema (cheap).
+
+    Without performance_schema, changes are detected only by update time (in seconds),
+    row count and so on; use ``ChecksumTracker`` for exact detection.
+    """
+    name = 'statistics'
+
+    def __init__(self, use_performance_schema=True):
+        self.use_performance_schema = use_performance_schema
+
+    def get_signatures(self, cursor, db, tables=None):
+        try:
+            cursor.execute('SET SESSION information_schema_stats_expiry = 0')  # MySQL 8.0+ caches statistics
+        except pymysql.err.MySQLError:
+            pass
+
+        if self.use_performance_schema:
+            cursor.execute(TABLE_STATISTICS % TABLE_IO_COUNTERS, (db,))
+        else:
+            cursor.execute(TABLE_STATISTICS % ('', ''), (db,))
+
+        return dict((row[0], tuple(row[1:])) for row in cursor.fetchall()
+                    if tables is None or row[0] in tables)
+
+
+def get_tracker(cursor, tracking='auto'):
+    if tracking == 'checksum':
+        return ChecksumTracker()
+    elif tracking == 'statistics':
+        return StatisticsTracker(is_performance_schema_enabled(cursor))
+    elif tracking == 'auto':
+        if is_performance_schema_enabled(cursor):
+            return StatisticsTracker()
+        else:
+            return ChecksumTracker()
+    else:
+        raise ValueError("unknown tracking: %s" % tracking)
+
+
+def is_performance_schema_enabled(cursor):
+    try:
+        cursor.execute('SELECT @@GLOBAL.performance_schema')
+        return bool(cursor.fetchone()[0])
+    except pymysql.err.MySQLError:
+        return False
+
+
+class ResetResult(object):
+    def __init__(self, tables, elapsed):
+        self.tables = tables  # names of reset tables
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return '<ResetResult tables=%r elapsed=%.3fs>' % (self.tables, self.elapsed)
+
+
+class TableResetter(object):
+    """Resets only the tables changed since the checkpoint.
+
+    ``checkpoint()`` copies tables of ``db`` to the template schema and
+    records signatures of them.  ``reset()`` reloads the tables whose
+    signatures are changed from the template, drops the tables created after
+    the checkpoint and restores dropped ones.  Foreign key checks are
+    disabled during the reset.
+    """
+
+    def __init__(self, mysqld, db='test', template=None, tracking='auto'):
+        self.mysqld = mysqld
+        self.db = db
+        self.template = template or '_checkpoint_%s' % db
+        self.tracking = tracking
+        self.tracker = None
+        self.signatures = None
+        self.rows = {}  # whether each table has rows at the checkpoint
+        self.definitions = {}  # CREATE TABLE statement of each table at the checkpoint
+
+    def cursor(self):
+        return closing(self.mysqld.connection().cursor())
+
+    def checkpoint(self):
+        with self.cursor() as cursor:
+            if self.tracker is None:
+                self.tracker = get_tracker(cursor, self.tracking)
+
+            cursor.execute('DROP DATABASE IF EXISTS %s' % quote(self.template))
+            cursor.execute('CREATE DATABASE %s' % quote(self.template))
+            copy_tables(cursor, self.db, self.template)
+
+            self.rows = {}
+            self.definitions = {}
+            cursor.execute(TABLES, (self.template,))
+            for (table,) in cursor.fetchall():
+                cursor.execute('SELECT EXISTS(SELECT 1 FROM %s.%s)' % (quote(self.template), quote(table)))
+                self.rows[table] = cursor.fetchone()[0]
+                self.definitions[table] = get_definition(cursor, '%s.%s' % (quote(self.db), quote(table)))
+
+            self.signatures = self.tracker.get_signatures(cursor, self.db)
+
+    def changed_tables(self):
+        """Returns names of tables changed (or created, dropped) since the checkpoint"""
+        if self.signatures is None:
+            raise RuntimeError("checkpoint of %s is not taken" % self.db)
+
+        with self.cursor() as cursor:
+            signatures = self.tracker.get_signatures(cursor, self.db)
+
+        tables = set(signatures) | set(self.signatures)
+        return sorted(t for t in tables if signatures.get(t) != self.signatures.get(t))
+
+    def reset(self):
+        started_at = time()
+        tables = self.changed_tables()
+        if tables:
+            with self.cursor() as cursor:
+                cursor.execute('SET foreign_key_checks = 0')
+                try:
+                    for table in tables:
+                        self.reset_table(cursor, table)
+                finally:
+                    cursor.execute('SET foreign_key_checks = 1')
+
+                # the reset itself changes statistics of the tables
+                existing = [table for table in tables if table in self.definitions]
+                self.signatures.update(self.tracker.get_signatures(cursor, self.db, existing))
+
+        return ResetResult(tables, time() - started_at)
+
+    def reset_table(self, cursor, table):
+        target = '%s.%s' % (quote(self.db), quote(table))
+        if table not in self.definitions:  # created after the checkpoint
+            cursor.execute('DROP TABLE IF EXISTS %s' % target)
+            return
+
+        if get_definition(cursor, target) != self.definitions[table]:  # dropped or altered
+            cursor.execute('DROP TABLE IF EXISTS %s' % target)
+            cursor.execute(self.definitions[table].replace('CREATE TABLE ', 'CREATE TABLE %s.' % quote(self.db), 1))
+        else:
+            try:
+                cursor.execute('TRUNCATE TABLE %s' % target)
+            except pymysql.err.MySQLError:
+                cursor.execute('DELETE FROM %s' % target)
+
+        if self.rows[table]:
+            copy_rows(cursor, self.template, table, target)
+
+    def drop(self):
+        with self.cursor() as cursor:
+            cursor.execute('DROP DATABASE IF EXISTS %s' % quote(self.template))
+        self.signatures = None
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import socket
+import tempfile
+import threading
+import testing.mysqld
+from shutil import rmtree
+from contextlib import closing
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from testing.mysqld import aio
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio interface requires Python 3.5+")
+class TestAsyncProbe(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        rmtree(self.tmpdir)
+
+    def test_probe_server(self):
+        path = os.path.join(self.tmpdir, 'mysql.sock')
+        self.assertFalse(self.loop.run_until_complete(aio.probe_server(unix_socket=path)))
+        self.assertFalse(self.loop.run_until_complete(aio.probe_server()))
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        def handshake():
+            conn, _ = server.accept()
+            conn.sendall(b'\x4a\x00\x00\x00\x0a8.0.35\x00')
+            conn.close()
+
+        thread = threading.Thread(target=handshake)
+        thread.start()
+        try:
+            self.assertTrue(self.loop.run_until_complete(aio.probe_server(unix_socket=path)))
+        finally:
+            thread.join()
+            server.close()
+
+    def test_astart(self):
+        mysqld = testing.mysqld.Mysqld.astart(my_cnf={'skip-networking': None})
+        self.assertIsInstance(mysqld, aio.AsyncMysqld)
+        self.assertIsNone(mysqld.process)
+        with self.assertRaises(AttributeError):
+            mysqld.dsn()  # not started yet
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio interface requires Python 3.5+")
+class TestAsyncMysqld(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_start_and_stop(self):
+        mysqld = self.loop.run_until_complete(testing.mysqld.Mysqld.astart(my_cnf={'skip-networking': None}))
+        try:
+            self.assertTrue(mysqld.is_alive())
+            self.assertIn('ready', mysqld.boot_timings)
+            with closing(pymysql.connect(**mysqld.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute('SELECT 1')
+                    self.assertEqual(((1,),), cursor.fetchall())
+
+            params = mysqld.adsn()
+            self.assertEqual('test', params['db'])
+            self.assertNotIn('passwd', params)
+        finally:
+            self.loop.run_until_complete(mysqld.stop())
+
+        self.assertFalse(mysqld.is_alive())
+        self.assertFalse(os.path.exists(mysqld.base_dir))
+
+    def test_start_many(self):
+        servers = self.loop.run_until_complete(aio.start_many(2))
+        try:
+            self.assertNotEqual(servers[0].my_cnf['port'], servers[1].my_cnf['port'])
+            for server in servers:
+                self.assertTrue(server.is_alive())
+        finally:
+            self.loop.run_until_complete(asyncio.gather(*[server.stop() for server in servers]))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import tempfile
+from mock import patch
+from shutil import rmtree
+from testing.mysqld import benchmark
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+def get_results(**means):
+    results = [benchmark.summarize(name, None, [mean], size=0) for name, mean in sorted(means.items())]
+    return dict(server='mysqld  Ver 8.0.35', results=results)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_summarize(self):
+        result = benchmark.summarize('clone', 'fast', [1.0, 2.0, 3.0], size=64, strategy='reflink')
+        self.assertEqual('fast', result['profile'])
+        self.assertEqual(2.0, result['mean'])
+        self.assertEqual(1.0, result['min'])
+        self.assertEqual(3.0, result['max'])
+        self.assertEqual('clone[profile=fast,size=64]', benchmark.get_key(result))
+
+        result = benchmark.summarize('cold_init', None, [1.0])
+        self.assertEqual('cold_init[profile=default]', benchmark.get_key(result))
+
+    def test_compare(self):
+        baseline = get_results(cold_init=1.0, stop=0.5, clone=0)
+        results = get_results(cold_init=1.5, stop=0.5, clone=0.1, query=0.001)
+        comparisons = dict((c['key'], c) for c in benchmark.compare(results, baseline, threshold=1.2))
+
+        self.assertEqual(['cold_init[profile=default,size=0]', 'stop[profile=default,size=0]'],
+                         sorted(comparisons))
+        self.assertEqual(1.5, comparisons['cold_init[profile=default,size=0]']['ratio'])
+        self.assertTrue(comparisons['cold_init[profile=default,size=0]']['regression'])
+        self.assertFalse(comparisons['stop[profile=default,size=0]']['regression'])
+
+    def test_print_table(self):
+        results = get_results(cold_init=1.5)
+        out = StringIO()
+        benchmark.print_table(results, benchmark.compare(results, get_results(cold_init=1.0)), out)
+        self.assertIn('cold_init[profile=default,size=0]', out.getvalue())
+        self.assertIn('1.50x !', out.getvalue())
+
+    @patch('testing.mysqld.benchmark.print_table')
+    @patch('testing.mysqld.benchmark.run')
+    def test_main(self, run, print_table):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            output = os.path.join(tmpdir, 'result.json')
+            run.return_value = get_results(cold_init=1.0)
+            self.assertEqual(0, benchmark.main(['--profile', 'fast', '--sizes', '0,16', '--output', output]))
+            run.assert_called_with(['fast'], [0, 16], benchmark.SCENARIOS, 1000, 3)
+
+            run.return_value = get_results(cold_init=2.0)
+            self.assertEqual(1, benchmark.main(['--baseline', output]))
+
+            with open(output) as fd:
+                self.assertEqual(1.0, json.load(fd)['results'][0]['mean'])
+        finally:
+            rmtree(tmpdir)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import functools
+import testing.mysqld
+from time import time
+from shutil import rmtree
+from contextlib import closing
+from testing.mysqld.cache import PersistentCache
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+def create_datadir(path, filename='ibdata1'):
+    os.makedirs(path)
+    with open(os.path.join(path, filename), 'w') as fd:
+        fd.write('x' * 1024)
+
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = PersistentCache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_get_key(self):
+        def handler(mysqld):
+            pass
+
+        key = self.cache.get_key('mysqld Ver 5.7.15', {'character-set-server': 'utf8'}, handler)
+        self.assertEqual(key, self.cache.get_key('mysqld Ver 5.7.15', {'character-set-server': 'utf8'}, handler))
+
+        # instance specific settings are ignored
+        self.assertEqual(key, self.cache.get_key('mysqld Ver 5.7.15',
+                                                 {'character-set-server': 'utf8', 'port': 12345},
+                                                 handler))
+
+        self.assertNotEqual(key, self.cache.get_key('mysqld Ver 8.0.1', {'character-set-server': 'utf8'}, handler))
+        self.assertNotEqual(key, self.cache.get_key('mysqld Ver 5.7.15', {}, handler))
+        self.assertNotEqual(key, self.cache.get_key('mysqld Ver 5.7.15', {'character-set-server': 'utf8'}))
+
+    def test_get_key_with_handler_contents(self):
+        def create_handler(table):
+            def handler(mysqld):
+                mysqld.execute("CREATE TABLE %s (id int)" % table)
+            return handler
+
+        def create_literal_handler(flag):
+            if flag:
+                def handler(mysqld):
+                    mysqld.execute("CREATE TABLE hello (id int)")
+            else:
+                def handler(mysqld):
+                    mysqld.execute("CREATE TABLE world (id int)")
+            return handler
+
+        def get_key(handler):
+            return self.cache.get_key('mysqld Ver 5.7.15', {}, handler)
+
+        # string literals
+        self.assertNotEqual(get_key(create_literal_handler(True)), get_key(create_literal_handler(False)))
+
+        # values captured by closures
+        self.assertEqual(get_key(create_handler('hello')), get_key(create_handler('hello')))
+        self.assertNotEqual(get_key(create_handler('hello')), get_key(create_handler('world')))
+
+    def test_get_key_is_stable_across_processes(self):
+        class Fixtures(object):
+            def load(self, mysqld):
+                pass
+
+        def create_handler(fixtures):
+            def handler(mysqld):
+                fixtures.load(mysqld)
+            return handler
+
+        def load(mysqld, table):
+            pass
+
+        def get_key(handler):
+            return self.cache.get_key('mysqld Ver 5.7.15', {}, handler)
+
+        # addresses of objects are not a part of the key
+        fixtures1, fixtures2 = Fixtures(), Fixtures()
+        self.assertEqual(get_key(create_handler(fixtures1)), get_key(create_handler(fixtures2)))
+        self.assertEqual(get_key(fixtures1.load), get_key(fixtures2.load))
+
+        self.assertEqual(get_key(functools.partial(load, table='hello')),
+                         get_key(functools.partial(load, table='hello')))
+        self.assertNotEqual(get_key(functools.partial(load, table='hello')),
+                            get_key(functools.partial(load, table='world')))
+
+    def test_store_and_lookup(self):
+        data_dir = os.path.join(self.tmpdir, 'var')
+        create_datadir(data_dir)
+
+        self.assertIsNone(self.cache.lookup('key1'))
+        path = self.cache.store('key1', data_dir)
+        self.assertEqual(path, self.cache.lookup('key1'))
+        self.assertTrue(os.path.exists(os.path.join(path, 'ibdata1')))
+        self.assertEqual(['key1'], self.cache.entries())
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.lookup('key1'))
+
+    def test_evict_by_entries(self):
+        self.cache.max_entries = 2
+        data_dir = os.path.join(self.tmpdir, 'var')
+        create_datadir(data_dir)
+
+        for i, key in enumerate(['key1', 'key2']):
+            path = self.cache.store(key, data_dir)
+            os.utime(path, (time() - 100 + i, time() - 100 + i))
+        self.cache.lookup('key1')  # key2 becomes least recently used
+
+        self.cache.store('key3', data_dir)
+        self.assertEqual(['key3', 'key1'], self.cache.entries())
+
+    def test_evict_by_size(self):
+        self.cache.max_size = 2048
+        data_dir = os.path.join(self.tmpdir, 'var')
+        create_datadir(data_dir)
+
+        path = self.cache.store('key1', data_dir)
+        os.utime(path, (time() - 100, time() - 100))
+        path = self.cache.store('key2', data_dir)
+        os.utime(path, (time() - 50, time() - 50))
+        self.assertEqual(['key2', 'key1'], self.cache.entries())
+
+        self.cache.store('key3', data_dir)
+        self.assertEqual(['key3', 'key2'], self.cache.entries())
+
+    def test_evict_skips_held_entries(self):
+        self.cache.max_entries = 1
+        data_dir = os.path.join(self.tmpdir, 'var')
+        create_datadir(data_dir)
+
+        self.cache.store('key1', data_dir)
+        holder = self.cache.hold('key1')
+        try:
+            self.cache.store('key2', data_dir)
+            self.assertEqual(set(['key1', 'key2']), set(self.cache.entries()))
+        finally:
+            holder.close()
+
+        self.cache.store('key3', data_dir)
+        self.assertEqual(['key3'], self.cache.entries())
+
+
+class TestMysqldFactoryWithPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_persistent_cache(self):
+        def handler(mysqld):
+            conn = pymysql.connect(**mysqld.dsn())
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+                cursor.execute("INSERT INTO hello values(1, 'hello'), (2, 'ciao')")
+            conn.commit()
+            conn.close()
+
+        Mysqld = testing.mysqld.MysqldFactory(cache_initialized_db=True,
+                                              on_initialized=handler,
+                                              persistent_cache=self.tmpdir,
+                                              my_cnf={'skip-networking': None})
+        copy_data_from = Mysqld.settings['copy_data_from']
+        self.assertTrue(copy_data_from.startswith(self.tmpdir))
+
+        with Mysqld() as mysqld:
+            conn = pymysql.connect(**mysqld.dsn())
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('SELECT * FROM hello ORDER BY id')
+                self.assertEqual(cursor.fetchall(), ((1, 'hello'), (2, 'ciao')))
+            conn.close()
+
+        # cache is not removed
+        Mysqld.clear_cache()
+        self.assertTrue(os.path.exists(copy_data_from))
+
+        # another factory reuses the cache
+        Mysqld = testing.mysqld.MysqldFactory(cache_initialized_db=True,
+                                              on_initialized=handler,
+                                              persistent_cache=self.tmpdir,
+                                              my_cnf={'skip-networking': None})
+        self.assertEqual(copy_data_from, Mysqld.settings['copy_data_from'])
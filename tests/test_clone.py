@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import testing.mysqld
+from shutil import rmtree
+from testing.mysqld.clone import clone_directory
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestCloneDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, 'source')
+        for path in ('ibdata1', 'test/hello.frm', 'test/hello.ibd'):
+            filename = os.path.join(self.source, path)
+            if not os.path.exists(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'w') as fd:
+                fd.write(path)
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def assertCloned(self, destination):
+        for path in ('ibdata1', 'test/hello.frm', 'test/hello.ibd'):
+            with open(os.path.join(destination, path)) as fd:
+                self.assertEqual(path, fd.read())
+
+    def test_copy(self):
+        destination = os.path.join(self.tmpdir, 'destination')
+        result = clone_directory(self.source, destination, ['copy'])
+        self.assertCloned(destination)
+        self.assertEqual('copy', result.strategy)
+        self.assertEqual({'copy': 3}, result.files)
+        self.assertIsNotNone(result.elapsed)
+
+    def test_hardlink(self):
+        destination = os.path.join(self.tmpdir, 'destination')
+        result = clone_directory(self.source, destination, ['hardlink', 'copy'])
+        self.assertCloned(destination)
+        self.assertEqual('hardlink+copy', result.strategy)
+        self.assertEqual({'hardlink': 1, 'copy': 2}, result.files)
+
+        # files written by mysqld are not shared with source
+        self.assertEqual(2, os.stat(os.path.join(destination, 'test/hello.frm')).st_nlink)
+        self.assertEqual(1, os.stat(os.path.join(destination, 'test/hello.ibd')).st_nlink)
+
+    def test_default_strategies(self):
+        destination = os.path.join(self.tmpdir, 'destination')
+        result = clone_directory(self.source, destination)
+        self.assertCloned(destination)
+        self.assertEqual(3, sum(result.files.values()))
+
+
+class TestMysqldCloneStrategies(unittest.TestCase):
+    def test_copy_data_from(self):
+        try:
+            tmpdir = tempfile.mkdtemp()
+            with testing.mysqld.Mysqld(my_cnf={'skip-networking': None}, base_dir=tmpdir) as mysqld:
+                conn = pymysql.connect(**mysqld.dsn())
+                cursor = conn.cursor()
+                cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+                cursor.execute("INSERT INTO hello values(1, 'hello'), (2, 'ciao')")
+                conn.commit()
+
+            data_dir = os.path.join(tmpdir, 'var')
+            with testing.mysqld.Mysqld(my_cnf={'skip-networking': None}, copy_data_from=data_dir,
+                                       clone_strategies=['hardlink', 'copy']) as mysqld:
+                self.assertIn(mysqld.clone_result.strategy, ('copy', 'hardlink+copy'))
+
+                conn = pymysql.connect(**mysqld.dsn())
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO test.hello values(3, 'hola')")
+                conn.commit()
+
+            # source datadir is not modified
+            with testing.mysqld.Mysqld(my_cnf={'skip-networking': None}, copy_data_from=data_dir) as mysqld:
+                conn = pymysql.connect(**mysqld.dsn())
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM test.hello ORDER BY id')
+                self.assertEqual(cursor.fetchall(), ((1, 'hello'), (2, 'ciao')))
+        finally:
+            rmtree(tmpdir)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import threading
+import testing.mysqld
+from mock import Mock, call, patch
+from shutil import rmtree
+from testing.mysqld.connections import ConnectionPool
+from testing.mysqld.discovery import DiscoveryCache
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+def create_connection(**params):
+    return Mock(open=True, params=params)
+
+
+@patch('testing.mysqld.connections.pymysql.connect', side_effect=create_connection)
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.mysqld = Mock(server_pid=100)
+        self.mysqld.dsn.side_effect = lambda **kwargs: dict(kwargs, unix_socket='/tmp/mysql.sock')
+
+    def test_reuse(self, connect):
+        pool = ConnectionPool(self.mysqld, db='test')
+        with pool.connection() as conn1:
+            self.assertEqual('test', conn1.params['db'])
+        with pool.connection() as conn2:
+            self.assertIs(conn1, conn2)
+        self.assertEqual(1, connect.call_count)
+        self.assertEqual(2, conn1.rollback.call_count)  # reset on every release
+
+    def test_default_database(self, connect):
+        pool = ConnectionPool(self.mysqld)
+        with pool.connection() as conn:
+            self.assertIsNone(conn.params['db'])
+
+    def test_concurrent_use(self, connect):
+        pool = ConnectionPool(self.mysqld, size=1)
+        conn1 = pool.acquire()
+        conn2 = pool.acquire()
+        self.assertIsNot(conn1, conn2)
+
+        pool.release(conn1)
+        pool.release(conn2)  # exceeds size of the pool
+        self.assertTrue(conn2.close.called)
+        self.assertIs(conn1, pool.acquire())
+
+    def test_restart(self, connect):
+        pool = ConnectionPool(self.mysqld)
+        conn1 = pool.acquire()
+        pool.release(conn1)
+
+        self.mysqld.server_pid = 200  # restarted
+        conn2 = pool.acquire()
+        self.assertIsNot(conn1, conn2)
+        self.assertTrue(conn1.close.called)
+
+        # connection opened before restart is not reused
+        conn3 = pool.acquire()
+        self.mysqld.server_pid = 300
+        pool.release(conn3)
+        self.assertTrue(conn3.close.called)
+        self.assertEqual([], pool.idle)
+
+    def test_broken_connection(self, connect):
+        pool = ConnectionPool(self.mysqld)
+        conn = pool.acquire()
+        conn.rollback.side_effect = Exception
+        pool.release(conn)
+        self.assertTrue(conn.close.called)
+        self.assertEqual([], pool.idle)
+
+    def test_threads(self, connect):
+        pool = ConnectionPool(self.mysqld, size=2)
+        acquired = []
+
+        def worker():
+            for _ in range(100):
+                with pool.connection() as conn:
+                    acquired.append(conn)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(400, len(acquired))
+        self.assertLessEqual(len(pool.idle), 2)
+        self.assertEqual({}, pool.servers)
+
+    def test_close(self, connect):
+        pool = ConnectionPool(self.mysqld)
+        conn = pool.acquire()
+        pool.close()
+        pool.release(conn)
+        self.assertTrue(conn.close.called)
+        self.assertEqual([], pool.idle)
+
+
+class TestAdminConnection(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        mysqld = os.path.join(self.tmpdir, 'mysqld')
+        discovery_cache = DiscoveryCache(os.path.join(self.tmpdir, 'discovery.json'))
+        patcher = patch('testing.mysqld.discovery_cache', discovery_cache)  # keep ~/.cache clean
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with open(mysqld, 'w') as fd:
+            fd.write("#!/bin/sh\necho 'mysqld  Ver 8.0.35 for Linux on x86_64 (MySQL Community Server - GPL)'\n")
+        os.chmod(mysqld, 0o755)
+        self.mysqld = testing.mysqld.Mysqld(auto_start=0, mysqld=mysqld, mysql_install_db=mysqld,
+                                            my_cnf={'skip-networking': None})
+
+    def tearDown(self):
+        self.mysqld.cleanup()
+        rmtree(self.tmpdir)
+
+    def test_admin_connection_in_poststart(self):
+        connections = []
+
+        def connect(**params):
+            connections.append(Mock(open=True))
+            return connections[-1]
+
+        with patch('testing.mysqld.pymysql.connect', side_effect=connect):
+            self.mysqld.poststart()
+            self.assertIs(connections[0], self.mysqld.connection())
+
+        # test database is created by the admin connection; it is reused by helpers
+        self.assertEqual(1, len(connections))
+        self.assertEqual([call('SET sql_log_bin = 0'), call('CREATE DATABASE IF NOT EXISTS test'),
+                          call('SET sql_log_bin = 1')],
+                         connections[0].query.call_args_list)
+        self.assertFalse(connections[0].close.called)
+
+
+class TestMysqldConnections(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+
+    def test_connection(self):
+        conn = self.mysqld.connection()
+        self.assertIs(conn, self.mysqld.connection())
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT DATABASE()')
+            self.assertEqual((None,), cursor.fetchone())
+
+    def test_pool(self):
+        pool = self.mysqld.pool(db='test')
+        self.assertIs(pool, self.mysqld.pool(db='test'))
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT DATABASE()')
+                self.assertEqual(('test',), cursor.fetchone())
+
+    def test_reconnect_after_restart(self):
+        conn = self.mysqld.connection()
+        self.mysqld.snapshot('connections')  # restarts the server
+        self.assertFalse(conn.open)
+        with self.mysqld.connection().cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual((1,), cursor.fetchone())
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import sys
+import stat
+import tempfile
+import testing.mysqld
+from mock import patch
+from shutil import rmtree
+from testing.mysqld.discovery import DiscoveryCache
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestDiscoveryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache', 'discovery.json')
+        self.mysqld = self.create_program('mysqld', 'Ver 8.0.35 for Linux on x86_64 (MySQL Community Server - GPL)')
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def create_program(self, name, version):
+        path = os.path.join(self.tmpdir, 'bin', name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fd:
+            fd.write("#!/bin/sh\necho '%s  %s'\n" % (path, version))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def test_program(self):
+        cache = DiscoveryCache(self.path)
+        self.assertIsNone(cache.get_program('mysqld', ['sbin']))
+
+        cache.set_program('mysqld', ['sbin'], self.mysqld)
+        self.assertEqual(self.mysqld, cache.get_program('mysqld', ['sbin']))
+        self.assertIsNone(cache.get_program('mysqld', ['bin']))
+
+        # shared with other processes through the file
+        self.assertEqual(self.mysqld, DiscoveryCache(self.path).get_program('mysqld', ['sbin']))
+
+        # invalidated if $PATH is changed
+        with patch.dict(os.environ, PATH='/nonexistent'):
+            self.assertIsNone(cache.get_program('mysqld', ['sbin']))
+
+    def test_concurrent_store(self):
+        mysql_install_db = self.create_program('mysql_install_db', '')
+        cache1 = DiscoveryCache(self.path)
+        cache2 = DiscoveryCache(self.path)
+        cache1.get_program('mysqld', ['sbin'])  # load the (empty) file
+        cache2.get_program('mysqld', ['sbin'])
+
+        # entries stored by others are not overwritten
+        cache1.set_program('mysqld', ['sbin'], self.mysqld)
+        cache2.set_program('mysql_install_db', ['bin'], mysql_install_db)
+        cache2.set_version(self.mysqld, 'mysqld  Ver 8.0.35')
+
+        cache = DiscoveryCache(self.path)
+        self.assertEqual(self.mysqld, cache.get_program('mysqld', ['sbin']))
+        self.assertEqual(mysql_install_db, cache.get_program('mysql_install_db', ['bin']))
+        self.assertEqual('mysqld  Ver 8.0.35', cache.get_version(self.mysqld))
+
+        # and merged into memory of the writer
+        self.assertEqual(self.mysqld, cache2.get_program('mysqld', ['sbin']))
+
+    def test_version(self):
+        cache = DiscoveryCache(self.path)
+        cache.set_version(self.mysqld, 'mysqld  Ver 8.0.35')
+        self.assertEqual('mysqld  Ver 8.0.35', DiscoveryCache(self.path).get_version(self.mysqld))
+
+        # invalidated if the binary is modified
+        os.utime(self.mysqld, (0, 0))
+        self.assertIsNone(DiscoveryCache(self.path).get_version(self.mysqld))
+
+    def test_removed_program(self):
+        cache = DiscoveryCache(self.path)
+        cache.set_program('mysqld', ['sbin'], self.mysqld)
+        os.remove(self.mysqld)
+        self.assertIsNone(cache.get_program('mysqld', ['sbin']))
+
+    def test_prune_removed_programs(self):
+        mysqld = self.create_program('mysqld-removed', 'Ver 8.0.35')
+        cache = DiscoveryCache(self.path)
+        cache.set_version(mysqld, 'mysqld  Ver 8.0.35')
+        os.remove(mysqld)
+
+        # entries of removed binaries are dropped on the next save
+        cache.set_version(self.mysqld, 'mysqld  Ver 8.0.35')
+        with open(self.path) as fd:
+            self.assertEqual([self.mysqld], list(json.load(fd)['versions']))
+
+    def test_broken_cache(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as fd:
+            fd.write('{broken')
+        self.assertIsNone(DiscoveryCache(self.path).get_program('mysqld', ['sbin']))
+
+    def test_clear(self):
+        cache = DiscoveryCache(self.path)
+        cache.set_program('mysqld', ['sbin'], self.mysqld)
+        cache.clear()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(cache.get_program('mysqld', ['sbin']))
+
+    def test_find_program(self):
+        cache = DiscoveryCache(self.path)
+        with patch('testing.mysqld.discovery_cache', cache):
+            with patch.dict(os.environ, PATH=os.pathsep.join([os.path.dirname(self.mysqld), os.environ['PATH']])):
+                self.assertEqual(self.mysqld, testing.mysqld.find_program('mysqld', ['sbin']))
+
+                with patch('testing.mysqld.search_program') as search_program:
+                    self.assertEqual(self.mysqld, testing.mysqld.find_program('mysqld', ['sbin']))
+                    self.assertFalse(search_program.called)
+
+    def test_get_server_version(self):
+        cache = DiscoveryCache(self.path)
+        with patch('testing.mysqld.discovery_cache', cache):
+            version = testing.mysqld.get_server_version(self.mysqld)
+            self.assertIn('Ver 8.0.35', version)
+            self.assertEqual(('mysql', (8, 0, 35)), testing.mysqld.detect_server(self.mysqld))
+
+            with patch('testing.mysqld.subprocess.Popen') as Popen:
+                self.assertEqual(version, testing.mysqld.get_server_version(self.mysqld))
+                self.assertFalse(Popen.called)
+
+    def test_detect_unknown_server(self):
+        mysqld = self.create_program('mysqld-unknown', 'unknown')
+        with patch('testing.mysqld.discovery_cache', DiscoveryCache(self.path)):
+            self.assertEqual((None, None), testing.mysqld.detect_server(mysqld))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import tempfile
+import testing.mysqld
+from mock import Mock, patch
+from shutil import rmtree
+from contextlib import closing
+from testing.mysqld.fixtures import FixtureLoader, LoadResult, get_line_terminator, split_statements
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestSplitStatements(unittest.TestCase):
+    def split(self, script):
+        return list(split_statements(io.StringIO(script)))
+
+    def test_split_statements(self):
+        self.assertEqual(["CREATE TABLE hello(id int, value varchar(256))",
+                          "INSERT INTO hello VALUES(1, 'hello;'), (2, 'it''s'), (3, 'a\\';b')"],
+                         self.split(u"CREATE TABLE hello(id int, value varchar(256));\n"
+                                    u"INSERT INTO hello VALUES(1, 'hello;'), (2, 'it''s'), (3, 'a\\';b');\n"))
+
+    def test_comments(self):
+        self.assertEqual(["/*!40101 SET NAMES utf8 */",
+                          "SELECT 1",
+                          "SELECT `a;b`\nFROM hello"],
+                         self.split(u"-- MySQL dump; version 10.13\n"
+                                    u"/*!40101 SET NAMES utf8 */;\n"
+                                    u"# comment; here\n"
+                                    u"SELECT 1; -- trailing; comment\n"
+                                    u"SELECT `a;b`\n"
+                                    u"FROM hello;"))
+
+    def test_multiline_quote(self):
+        self.assertEqual(["INSERT INTO hello VALUES(1, 'line1;\nline2')"],
+                         self.split(u"INSERT INTO hello VALUES(1, 'line1;\nline2');\n"))
+
+    def test_delimiter(self):
+        self.assertEqual(["CREATE TRIGGER hello_trigger BEFORE INSERT ON hello\nFOR EACH ROW BEGIN SET @x = 1; END",
+                          "SELECT 1"],
+                         self.split(u"DELIMITER ;;\n"
+                                    u"CREATE TRIGGER hello_trigger BEFORE INSERT ON hello\n"
+                                    u"FOR EACH ROW BEGIN SET @x = 1; END ;;\n"
+                                    u"DELIMITER ;\n"
+                                    u"SELECT 1;\n"))
+
+    def test_delimiter_after_statement(self):
+        # DELIMITER is recognized only at the beginning of statement
+        self.assertEqual(["SELECT 1\nDELIMITER"],
+                         self.split(u"SELECT 1\nDELIMITER ;;\n;\n"))
+        self.assertEqual(["SELECT 1", "SELECT 2"],
+                         self.split(u"SELECT 1;\n  \n-- comment\nDELIMITER ;;\nSELECT 2;;\n"))
+
+    def test_long_statement(self):
+        lines = [u"INSERT INTO hello VALUES\n"] + [u"(%d, 'hello'),\n" % i for i in range(10000)] + [u"(0, '');\n"]
+        statements = list(split_statements(lines))
+        self.assertEqual(1, len(statements))
+        self.assertTrue(statements[0].endswith("(0, '')"))
+
+    def test_load_result(self):
+        self.assertEqual(500.0, LoadResult(1000, 2.0).rows_per_second)
+
+    def test_load_csv_fallback(self):
+        loader = FixtureLoader(Mock())
+        with patch.object(loader, 'load', side_effect=pymysql.err.OperationalError(3948, 'disabled')):
+            with patch.object(loader, 'load_rows', return_value='inserted') as load_rows:
+                self.assertEqual('inserted', loader.load_csv('hello', '/path/to/hello.csv'))
+                self.assertTrue(load_rows.called)
+
+        # errors in data are not hidden by the fallback
+        with patch.object(loader, 'load', side_effect=pymysql.err.IntegrityError(1062, 'Duplicate entry')):
+            with patch.object(loader, 'load_rows') as load_rows:
+                with self.assertRaises(pymysql.err.IntegrityError):
+                    loader.load_csv('hello', '/path/to/hello.csv')
+                self.assertFalse(load_rows.called)
+
+    def test_get_line_terminator(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'hello.csv')
+            with open(path, 'wb') as fd:
+                fd.write(b'id,value\r\n1,hello\r\n')
+            self.assertEqual('\r\n', get_line_terminator(path))
+
+            with open(path, 'wb') as fd:
+                fd.write(b'id,value\n1,hello\r\n')
+            self.assertEqual('\n', get_line_terminator(path))
+        finally:
+            rmtree(tmpdir)
+
+
+class TestFixtureLoader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+        cls.tmpdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+        rmtree(cls.tmpdir)
+
+    def setUp(self):
+        self.loader = FixtureLoader(self.mysqld, batch_size=2)
+        self.loader.load_sql(io.StringIO(u"DROP TABLE IF EXISTS hello;\n"
+                                         u"CREATE TABLE hello(id int PRIMARY KEY, value varchar(256));\n"))
+
+    def fetch(self):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('SELECT * FROM hello ORDER BY id')
+                return cursor.fetchall()
+
+    def test_load_sql(self):
+        path = os.path.join(self.tmpdir, 'dump.sql')
+        with io.open(path, 'w', encoding='utf-8') as fd:
+            fd.write(u"INSERT INTO hello VALUES(1, 'hello'), (2, 'ciao');\n")
+
+        result = self.loader.load_sql(path)
+        self.assertEqual(2, result.rows)
+        self.assertEqual(((1, 'hello'), (2, 'ciao')), self.fetch())
+
+    def test_load_rows(self):
+        result = self.loader.load_rows('hello', [(1, 'hello'), (2, 'ciao'), (3, 'hola')])
+        self.assertEqual(3, result.rows)
+
+        self.loader.load_rows('hello', iter([{'id': 4, 'value': 'salut'}]))
+        self.assertEqual(((1, 'hello'), (2, 'ciao'), (3, 'hola'), (4, 'salut')), self.fetch())
+
+    def test_load_csv(self):
+        path = os.path.join(self.tmpdir, 'hello.csv')
+        with io.open(path, 'w', encoding='utf-8') as fd:
+            fd.write(u'id,value\n1,hello\n2,"ciao, bella"\n')
+
+        result = self.loader.load_csv('hello', path)
+        self.assertEqual(2, result.rows)
+        self.assertEqual(((1, 'hello'), (2, 'ciao, bella')), self.fetch())
+
+    def test_load_csv_as_rfc4180(self):
+        path = os.path.join(self.tmpdir, 'hello.csv')
+        with io.open(path, 'w', encoding='utf-8', newline='') as fd:
+            fd.write(u'id,value\r\n1,C:\\new\r\n2,\\N\r\n3,"say ""hi"""\r\n')
+        expected = ((1, 'C:\\new'), (2, '\\N'), (3, 'say "hi"'))
+
+        self.loader.load_csv('hello', path)
+        self.assertEqual(expected, self.fetch())
+
+        # the fallback loads the file in the same way
+        self.loader.load_sql(io.StringIO(u"DELETE FROM hello;\n"))
+        error = pymysql.err.OperationalError(3948, 'disabled')
+        with patch('testing.mysqld.fixtures.enable_local_infile', side_effect=error):
+            self.loader.load_csv('hello', path)
+        self.assertEqual(expected, self.fetch())
@@ -257,6 +257,37 @@ class TestMysqld(unittest.TestCase):
         Mysqld.clear_cache()
         self.assertFalse(os.path.exists(copy_data_from1))
 
+    def test_MysqldFactory_with_read_only(self):
+        def handler(mysqld):
+            conn = pymysql.connect(**mysqld.dsn())
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+                cursor.execute("INSERT INTO hello values(1, 'hello'), (2, 'ciao')")
+            conn.commit()
+            conn.close()
+
+        Mysqld = testing.mysqld.MysqldFactory(cache_initialized_db=True, read_only=True,
+                                              on_initialized=handler)
+        try:
+            with Mysqld() as mysqld1, Mysqld() as mysqld2:
+                # both servers run over the cached datadir (without copying)
+                self.assertEqual(Mysqld.cache.get_data_directory(), mysqld1.get_data_directory())
+                self.assertEqual(Mysqld.cache.get_data_directory(), mysqld2.get_data_directory())
+                self.assertIsNone(mysqld1.clone_result)
+
+                for mysqld in (mysqld1, mysqld2):
+                    conn = pymysql.connect(**mysqld.dsn())
+                    with closing(conn.cursor()) as cursor:
+                        cursor.execute('SELECT * FROM hello ORDER BY id')
+                        self.assertEqual(cursor.fetchall(), ((1, 'hello'), (2, 'ciao')))
+                        with self.assertRaises(pymysql.err.MySQLError):
+                            cursor.execute("INSERT INTO hello values(3, 'bonjour')")
+                    conn.close()
+
+            self.assertTrue(os.path.exists(Mysqld.cache.get_data_directory()))
+        finally:
+            Mysqld.clear_cache()
+
     def test_MysqldFactory_with_initialized_handler(self):
         def handler(mysqld):
             conn = pymysql.connect(**mysqld.dsn())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import stat
+import errno
+import tempfile
+import testing.mysqld
+from mock import patch
+from shutil import rmtree
+from testing.mysqld import network
+from testing.mysqld.discovery import DiscoveryCache
+from testing.mysqld.parallel import allocate_ports
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestPortReservation(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_reserve_port(self):
+        port = network.reserve_port(self.tmpdir)
+        try:
+            self.assertTrue(network.is_reserved(port))
+            self.assertTrue(os.path.exists(os.path.join(self.tmpdir, '%d.lock' % port)))
+
+            # locked by the reservation
+            self.assertIsNone(network.acquire_lock(os.path.join(self.tmpdir, '%d.lock' % port)))
+        finally:
+            network.release_port(port)
+
+        self.assertFalse(network.is_reserved(port))
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, '%d.lock' % port)))
+        network.release_port(port)  # no error
+
+    def test_reserve_port_skips_locked_ports(self):
+        candidates = [network.get_unused_port(), network.get_unused_port()]
+        fd = network.acquire_lock(os.path.join(self.tmpdir, '%d.lock' % candidates[0]))  # locked by others
+        try:
+            with patch('testing.mysqld.network.get_unused_port', side_effect=candidates):
+                port = network.reserve_port(self.tmpdir)
+            self.assertEqual(candidates[1], port)
+            network.release_port(port)
+        finally:
+            os.close(fd)
+
+    def test_acquire_lock(self):
+        path = os.path.join(self.tmpdir, '3306.lock')
+        fd = network.acquire_lock(path)
+        try:
+            self.assertEqual(0o644, stat.S_IMODE(os.stat(path).st_mode))  # lockable by other users
+        finally:
+            os.close(fd)
+
+        # lock files of other users
+        error = OSError(errno.EACCES, 'Permission denied')
+        with patch('testing.mysqld.network.open_lock_file', side_effect=error):
+            self.assertIsNone(network.acquire_lock(path))
+
+    def test_release_all_ports(self):
+        ports = [network.reserve_port(self.tmpdir), network.reserve_port(self.tmpdir)]
+        network.release_all_ports()
+        self.assertFalse(any(network.is_reserved(port) for port in ports))
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+    def test_allocate_ports(self):
+        ports = allocate_ports(3)
+        try:
+            self.assertEqual(3, len(set(ports)))
+            self.assertTrue(all(network.is_reserved(port) for port in ports))
+        finally:
+            for port in ports:
+                network.release_port(port)
+
+    def test_is_port_conflicted(self):
+        self.assertTrue(network.is_port_conflicted(
+            "[ERROR] [MY-010262] [Server] Can't start server: Bind on TCP/IP port: Address already in use\n"
+        ))
+        self.assertTrue(network.is_port_conflicted(
+            "[ERROR] Can't start server: Bind on TCP/IP port. Got error: 98: Address already in use\n"
+        ))
+        self.assertFalse(network.is_port_conflicted("[ERROR] Aborting\n"))
+
+    def test_get_socket_path(self):
+        self.assertEqual('/tmp/abc/tmp/mysql.sock', network.get_socket_path('/tmp/abc'))
+        self.assertIsNone(network.get_socket_path('/tmp/' + 'x' * 100))
+
+
+class TestMysqldNetwork(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.mysqld = os.path.join(self.tmpdir, 'mysqld')
+        discovery_cache = DiscoveryCache(os.path.join(self.tmpdir, 'discovery.json'))
+        patcher = patch('testing.mysqld.discovery_cache', discovery_cache)  # keep ~/.cache clean
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with open(self.mysqld, 'w') as fd:
+            fd.write("#!/bin/sh\necho 'mysqld  Ver 8.0.35 for Linux on x86_64 (MySQL Community Server - GPL)'\n")
+        os.chmod(self.mysqld, os.stat(self.mysqld).st_mode | stat.S_IXUSR)
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_short_socket_path(self):
+        base_dir = os.path.join(self.tmpdir, *(['deep' * 10] * 3))
+        mysqld = testing.mysqld.Mysqld(auto_start=0, base_dir=base_dir, mysqld=self.mysqld,
+                                       mysql_install_db=self.mysqld)
+        try:
+            socket_dir = os.path.dirname(mysqld.my_cnf['socket'])
+            self.assertLessEqual(len(mysqld.my_cnf['socket']), network.MAX_SOCKET_PATH)
+            self.assertTrue(os.path.isdir(socket_dir))
+        finally:
+            mysqld.cleanup()
+
+        self.assertFalse(os.path.exists(socket_dir))
+
+    def test_reassign_port(self):
+        mysqld = testing.mysqld.Mysqld(auto_start=0, mysqld=self.mysqld, mysql_install_db=self.mysqld)
+        try:
+            os.makedirs(os.path.join(mysqld.base_dir, 'etc'))
+            port = mysqld.my_cnf['port'] = network.reserve_port()
+            with open(os.path.join(mysqld.base_dir, 'Mysqld.log'), 'w') as fd:
+                fd.write("[ERROR] Can't start server: Bind on TCP/IP port: Address already in use\n")
+
+            self.assertTrue(mysqld.reassign_port())
+            self.assertNotEqual(port, mysqld.my_cnf['port'])
+            self.assertFalse(network.is_reserved(port))
+            self.assertTrue(network.is_reserved(mysqld.my_cnf['port']))
+            with open(os.path.join(mysqld.base_dir, 'etc', 'my.cnf')) as fd:
+                self.assertIn('port=%d\n' % mysqld.my_cnf['port'], fd.read())
+
+            # port specified by user is never changed
+            network.release_port(mysqld.my_cnf['port'])
+            self.assertFalse(mysqld.reassign_port())
+        finally:
+            mysqld.cleanup()
+
+        self.assertFalse(network.is_reserved(mysqld.my_cnf['port']))
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import testing.mysqld
+from testing.mysqld import network
+from testing.mysqld.parallel import StartupError, start_many
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class DummyServer(object):
+    def __init__(self, **settings):
+        if settings.get('fail'):
+            raise RuntimeError('failed to launch')
+
+        self.settings = settings
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        network.release_port((self.settings.get('my_cnf') or {}).get('port'))
+
+
+class TestStartMany(unittest.TestCase):
+    def test_start_many(self):
+        servers = start_many(DummyServer, 4, {'my_cnf': {'character-set-server': 'utf8'}})
+        for server in servers:
+            self.addCleanup(server.stop)
+        self.assertEqual(4, len(servers))
+
+        ports = set(server.settings['my_cnf']['port'] for server in servers)
+        self.assertEqual(4, len(ports))
+        self.assertTrue(all(server.settings['my_cnf']['character-set-server'] == 'utf8' for server in servers))
+
+    def test_start_many_without_networking(self):
+        servers = start_many(DummyServer, 2, {'my_cnf': {'skip-networking': None}})
+        self.assertEqual(2, len(servers))
+        self.assertNotIn('port', servers[0].settings['my_cnf'])
+
+    def test_start_many_failed(self):
+        reserved = set(network.reservations)
+        with self.assertRaises(StartupError) as cm:
+            start_many(DummyServer, 2, {'fail': True})
+        self.assertEqual([0, 1], sorted(cm.exception.errors.keys()))
+        self.assertEqual(reserved, set(network.reservations))  # ports are released
+
+    def test_start_many_with_base_dir(self):
+        with self.assertRaises(ValueError):
+            start_many(DummyServer, 2, {'base_dir': '/tmp/mysqld'})
+
+    def test_start_many_with_port(self):
+        with self.assertRaises(ValueError):
+            start_many(DummyServer, 2, {'my_cnf': {'port': 3307}})
+
+        servers = start_many(DummyServer, 1, {'my_cnf': {'port': 3307}})
+        self.assertEqual(3307, servers[0].settings['my_cnf']['port'])
+
+
+class TestMysqldStartMany(unittest.TestCase):
+    def test_start_many(self):
+        servers = testing.mysqld.Mysqld.start_many(3)
+        try:
+            self.assertEqual(3, len(set(mysqld.server_pid for mysqld in servers)))
+            for mysqld in servers:
+                pymysql.connect(**mysqld.dsn()).close()
+        finally:
+            for mysqld in servers:
+                mysqld.stop()
+
+    def test_spawn(self):
+        Mysqld = testing.mysqld.MysqldFactory(cache_initialized_db=True, my_cnf={'skip-networking': None})
+        try:
+            servers = Mysqld.spawn(2)
+            for mysqld in servers:
+                self.assertTrue(mysqld.is_alive())
+                mysqld.stop()
+        finally:
+            Mysqld.clear_cache()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import testing.mysqld
+from time import time
+from contextlib import closing
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class DummyServer(object):
+    def __init__(self):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+class DummyFactory(object):
+    def __init__(self):
+        self.servers = []
+
+    def __call__(self):
+        server = DummyServer()
+        self.servers.append(server)
+        return server
+
+
+class TestMysqldPool(unittest.TestCase):
+    def test_acquire_and_release(self):
+        factory = DummyFactory()
+        with testing.mysqld.MysqldPool(size=2, factory=factory) as pool:
+            server1 = pool.acquire()
+            server2 = pool.acquire()
+            self.assertNotEqual(server1, server2)
+
+            # the released server is replaced by new one
+            pool.release(server1)
+            server3 = pool.acquire()
+            self.assertTrue(server1.stopped)
+            self.assertNotIn(server3, (server1, server2))
+            self.assertEqual(3, pool.metrics.acquired)
+            self.assertEqual(3, pool.metrics.hits + pool.metrics.misses)
+
+        self.assertTrue(all(server.stopped for server in factory.servers))
+
+    def test_acquire_timeout(self):
+        with testing.mysqld.MysqldPool(size=1, factory=DummyFactory()) as pool:
+            pool.acquire()
+            with self.assertRaises(RuntimeError):
+                pool.acquire(timeout=0.1)
+
+    def test_acquire_failed(self):
+        def factory():
+            raise RuntimeError("failed to launch")
+
+        with testing.mysqld.MysqldPool(size=1, factory=factory) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.acquire()
+        self.assertEqual(0, pool.metrics.acquired)
+
+    def test_acquire_without_wait(self):
+        with testing.mysqld.MysqldPool(size=1, factory=DummyFactory()) as pool:
+            pool.acquire()
+            started_at = time()
+            with self.assertRaises(RuntimeError):
+                pool.acquire(timeout=0)
+            self.assertLess(time() - started_at, 1)
+
+    def test_failure_on_stop(self):
+        class BrokenServer(DummyServer):
+            def stop(self):
+                raise RuntimeError("failed to stop")
+
+        servers = [BrokenServer(), DummyServer()]
+        with testing.mysqld.MysqldPool(size=1, factory=lambda: servers.pop(0)) as pool:
+            mysqld = pool.acquire()
+            pool.release(mysqld)  # replaced even if stop() fails
+            self.assertIsInstance(pool.acquire(timeout=5), DummyServer)
+
+    def test_reset_schemas(self):
+        with testing.mysqld.MysqldPool(size=1, reset='schemas', my_cnf={'skip-networking': None}) as pool:
+            mysqld = pool.acquire()
+            with closing(pymysql.connect(**mysqld.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+            pool.release(mysqld)
+
+            # same server is reused after reset
+            self.assertEqual(mysqld, pool.acquire())
+            with closing(pymysql.connect(**mysqld.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("SHOW TABLES")
+                    self.assertEqual((), cursor.fetchall())
+
+            self.assertEqual(2, pool.metrics.acquired)
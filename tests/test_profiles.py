@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import testing.mysqld
+from mock import patch
+from shutil import rmtree
+from testing.mysqld.discovery import DiscoveryCache
+from testing.mysqld.profiles import (
+    create_tmpfs_directory, get_footprint_settings, get_option_name, get_profile_settings, get_read_only_settings,
+    get_rss
+)
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestProfiles(unittest.TestCase):
+    def test_parse_server_version(self):
+        self.assertEqual(('mysql', (8, 0, 35)),
+                         testing.mysqld.parse_server_version('/usr/sbin/mysqld  Ver 8.0.35 for Linux on x86_64 '
+                                                             '(MySQL Community Server - GPL)'))
+        self.assertEqual(('mariadb', (10, 11, 6)),
+                         testing.mysqld.parse_server_version('/usr/sbin/mysqld  Ver 10.11.6-MariaDB-0+deb12u1 '
+                                                             'for debian-linux-gnu on x86_64 (Debian 12)'))
+        with self.assertRaises(RuntimeError):
+            testing.mysqld.parse_server_version('unknown')
+
+    def test_get_profile_settings(self):
+        self.assertEqual({}, get_profile_settings(None, 'mysql', (8, 0, 35)))
+        with self.assertRaises(ValueError):
+            get_profile_settings('unknown', 'mysql', (8, 0, 35))
+
+        settings = get_profile_settings('fast', 'mysql', (8, 0, 35))
+        self.assertEqual('0', settings['innodb_flush_log_at_trx_commit'])
+        self.assertEqual('8M', settings['innodb_redo_log_capacity'])
+        self.assertIn('skip-log-bin', settings)
+        self.assertNotIn('innodb_use_native_aio', settings)
+
+        settings = get_profile_settings('fast', 'mysql', (5, 7, 44), on_tmpfs=True)
+        self.assertEqual('8M', settings['innodb_log_file_size'])
+        self.assertNotIn('skip-log-bin', settings)
+        self.assertEqual('0', settings['innodb_use_native_aio'])
+
+        settings = get_profile_settings('fast', 'mariadb', (10, 11, 6))
+        self.assertEqual('8M', settings['innodb_log_file_size'])
+        self.assertNotIn('skip-log-bin', settings)
+
+    def test_get_footprint_settings(self):
+        self.assertEqual({}, get_footprint_settings(None, 'mysql', (8, 0, 35)))
+        with self.assertRaises(ValueError):
+            get_footprint_settings('unknown', 'mysql', (8, 0, 35))
+
+        settings = get_footprint_settings('minimal', 'mysql', (8, 0, 35))
+        self.assertEqual('5M', settings['innodb_buffer_pool_size'])
+        self.assertEqual('8M', settings['innodb_redo_log_capacity'])
+        self.assertEqual('OFF', settings['mysqlx'])
+        self.assertEqual('OFF', settings['performance_schema'])
+
+        settings = get_footprint_settings('small', 'mysql', (5, 7, 44))
+        self.assertEqual('32M', settings['innodb_buffer_pool_size'])
+        self.assertEqual('4M', settings['innodb_log_file_size'])
+        self.assertNotIn('mysqlx', settings)
+
+        settings = get_footprint_settings('minimal', 'mariadb', (10, 11, 6))
+        self.assertIn('loose-aria_pagecache_buffer_size', settings)
+        self.assertNotIn('loose-innodb_page_cleaners', settings)
+
+    def test_get_read_only_settings(self):
+        settings = get_read_only_settings('mysql', (8, 0, 35), '/tmp/mysqld/tmp')
+        self.assertEqual('ON', settings['innodb_read_only'])
+        self.assertEqual('ON', settings['loose-super_read_only'])
+        self.assertIn('skip-log-bin', settings)
+        self.assertEqual('/tmp/mysqld/tmp/#innodb_temp', settings['innodb_temp_tablespaces_dir'])
+
+        settings = get_read_only_settings('mysql', (5, 7, 44), '/tmp/mysqld/tmp')
+        self.assertNotIn('skip-log-bin', settings)
+        self.assertNotIn('innodb_temp_tablespaces_dir', settings)
+
+        with self.assertRaises(RuntimeError):
+            get_read_only_settings('mariadb', (10, 11, 6), '/tmp/mysqld/tmp')
+
+    def test_get_option_name(self):
+        self.assertEqual('innodb_page_cleaners', get_option_name('loose-innodb-page-cleaners'))
+        self.assertEqual('skip_log_bin', get_option_name('skip-log-bin'))
+
+    def test_get_rss(self):
+        self.assertGreater(get_rss(os.getpid()), 0)
+        self.assertIsNone(get_rss(None))
+
+    def test_create_tmpfs_directory(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = create_tmpfs_directory(tmpdir)
+            self.assertTrue(path.startswith(tmpdir))
+
+            with patch("testing.mysqld.profiles.get_free_space") as get_free_space:
+                get_free_space.return_value = 1024
+                self.assertIsNone(create_tmpfs_directory(tmpdir))
+        finally:
+            rmtree(tmpdir)
+
+
+class TestMysqldWithProfile(unittest.TestCase):
+    def test_fast_profile(self):
+        with testing.mysqld.Mysqld(profile='fast', my_cnf={'skip-networking': None}) as mysqld:
+            self.assertEqual('0', mysqld.my_cnf['innodb_flush_log_at_trx_commit'])
+            data_dir = mysqld.get_data_directory()
+
+            conn = pymysql.connect(**mysqld.dsn())
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT @@innodb_flush_log_at_trx_commit")
+                self.assertEqual(((0,),), cursor.fetchall())
+            conn.close()
+
+        self.assertFalse(os.path.exists(data_dir))
+
+    def test_profile_respects_my_cnf(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            mysqld_path = os.path.join(tmpdir, 'mysqld')
+            discovery_cache = DiscoveryCache(os.path.join(tmpdir, 'discovery.json'))
+            patcher = patch('testing.mysqld.discovery_cache', discovery_cache)  # keep ~/.cache clean
+            patcher.start()
+            self.addCleanup(patcher.stop)
+            with open(mysqld_path, 'w') as fd:
+                fd.write("#!/bin/sh\necho 'mysqld  Ver 8.0.35 for Linux on x86_64 (MySQL Community Server - GPL)'\n")
+            os.chmod(mysqld_path, 0o755)
+
+            my_cnf = {'innodb-buffer-pool-size': '256M', 'log_bin': 'mysql-bin', 'loose-long-query-time': '1'}
+            mysqld = testing.mysqld.Mysqld(auto_start=0, mysqld=mysqld_path, mysql_install_db=mysqld_path,
+                                           profile='fast', collect_stats=True, my_cnf=my_cnf)
+            try:
+                self.assertEqual('256M', mysqld.my_cnf['innodb-buffer-pool-size'])
+                self.assertNotIn('innodb_buffer_pool_size', mysqld.my_cnf)
+                self.assertNotIn('skip-log-bin', mysqld.my_cnf)
+                self.assertNotIn('long_query_time', mysqld.my_cnf)
+                self.assertEqual('0', mysqld.my_cnf['innodb_flush_log_at_trx_commit'])
+                self.assertTrue(mysqld.has_option('innodb_buffer_pool_size'))
+            finally:
+                mysqld.cleanup()
+        finally:
+            rmtree(tmpdir)
+
+    def test_minimal_footprint(self):
+        my_cnf = {'skip-networking': None, 'innodb-buffer-pool-size': '8M'}
+        with testing.mysqld.Mysqld(footprint='minimal', my_cnf=my_cnf) as mysqld:
+            self.assertNotIn('innodb_buffer_pool_size', mysqld.my_cnf)  # respects my_cnf
+            self.assertEqual('20', mysqld.my_cnf['max_connections'])
+            self.assertGreater(mysqld.rss_after_boot, 0)
+            self.assertGreater(mysqld.rss, 0)
+
+            conn = pymysql.connect(**mysqld.dsn())
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT @@innodb_buffer_pool_size")
+                self.assertEqual(((8 * 1024 * 1024,),), cursor.fetchall())
+            conn.close()
+
+            self.assertIsNotNone(mysqld.report()['rss']['after_boot'])
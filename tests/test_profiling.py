@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import tempfile
+import testing.mysqld
+from mock import Mock
+from shutil import rmtree
+from contextlib import closing
+from testing.mysqld.profiling import Timings, get_digests, get_slow_queries, get_status_delta, write_report
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestProfiling(unittest.TestCase):
+    def test_timings(self):
+        timings = Timings()
+        with timings.measure('boot'):
+            pass
+        timings.add('initialize_database', 1.5)
+        timings.add('boot', 1.0)
+
+        self.assertEqual(['boot', 'initialize_database'], list(timings.as_dict().keys()))
+        self.assertGreaterEqual(timings.get('boot'), 1.0)
+        self.assertEqual(1.5, timings.get('initialize_database'))
+        self.assertIsNone(timings.get('poststart'))
+
+    def test_get_status_delta(self):
+        before = {'Questions': 10, 'Uptime': 1, 'Com_select': 3}
+        after = {'Questions': 25, 'Uptime': 1, 'Com_select': 3, 'Com_insert': 2}
+        self.assertEqual({'Questions': 15, 'Com_insert': 2}, dict(get_status_delta(before, after)))
+
+    def test_get_slow_queries(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [(1.5, 1, 100000, b'test', b'SELECT SLEEP(1.5)')]
+        queries = get_slow_queries(cursor, 10)
+        self.assertEqual(1, len(queries))
+        self.assertEqual(1.5, queries[0]['query_time'])
+        self.assertEqual('SELECT SLEEP(1.5)', queries[0]['sql_text'])
+
+        cursor.execute.side_effect = pymysql.err.ProgrammingError
+        self.assertEqual([], get_slow_queries(cursor, 10))
+        self.assertEqual([], get_digests(cursor, 10))
+
+    def test_get_digests(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('test', 'SELECT * FROM `hello`', 3, 2500000000000, 30)]
+        digests = get_digests(cursor, 10)
+        self.assertEqual(2.5, digests[0]['total_time'])
+        self.assertEqual(3, digests[0]['count'])
+
+    def test_write_report(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'report.json')
+            write_report(path, {'name': 'Mysqld', 'timings': {'boot': 1.0}})
+            write_report(path, {'name': 'Mysqld', 'timings': {'boot': 2.0}})
+            with open(path) as fd:
+                reports = [json.loads(line) for line in fd]
+            self.assertEqual([1.0, 2.0], [report['timings']['boot'] for report in reports])
+        finally:
+            rmtree(tmpdir)
+
+
+class TestMysqldProfiling(unittest.TestCase):
+    def test_report(self):
+        reports = []
+        tmpdir = tempfile.mkdtemp()
+        try:
+            report_file = os.path.join(tmpdir, 'report.json')
+            mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None}, collect_stats=True,
+                                           report_file=report_file, on_report=reports.append)
+            with closing(pymysql.connect(**mysqld.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute('SELECT SLEEP(0.2)')
+
+            timings = mysqld.timings.as_dict()
+            for phase in ('find_program', 'initialize_database', 'boot', 'poststart'):
+                self.assertIn(phase, timings)
+
+            mysqld.stop()
+            self.assertEqual(1, len(reports))
+            self.assertIn('stop', reports[0]['timings'])
+            self.assertGreater(reports[0]['stats']['status']['Questions'], 0)
+            self.assertIn('SELECT SLEEP(0.2)', [query['sql_text'] for query in reports[0]['stats']['slow_queries']])
+
+            with open(report_file) as fd:
+                self.assertEqual(reports[0]['timings'], json.loads(fd.read())['timings'])
+
+            mysqld.stop()  # not reported twice
+            self.assertEqual(1, len(reports))
+        finally:
+            rmtree(tmpdir)
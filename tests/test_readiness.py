@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import socket
+import tempfile
+import threading
+import testing.mysqld
+from shutil import rmtree
+from testing.mysqld.readiness import BootlogWatcher, probe_server
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestReadiness(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_bootlog_watcher(self):
+        path = os.path.join(self.tmpdir, 'Mysqld.log')
+        watcher = BootlogWatcher(path)
+        self.assertFalse(watcher.poll())  # not created yet
+
+        with open(path, 'wb') as fd:
+            fd.write(b"[Note] X Plugin ready for connections. Bind-address: '::' port: 33060\n")
+            fd.write(b"[Note] /usr/sbin/mysqld: ready for ")
+            fd.flush()
+            self.assertFalse(watcher.poll())
+
+            fd.write(b"connections. Version: '8.0.35'\n")
+            fd.flush()
+            self.assertTrue(watcher.poll())
+
+    def test_probe_server(self):
+        path = os.path.join(self.tmpdir, 'mysql.sock')
+        self.assertFalse(probe_server(unix_socket=path))
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        def handshake():
+            conn, _ = server.accept()
+            conn.sendall(b'\x4a\x00\x00\x00\x0a8.0.35\x00')
+            conn.close()
+
+        thread = threading.Thread(target=handshake)
+        thread.start()
+        try:
+            self.assertTrue(probe_server(unix_socket=path))
+        finally:
+            thread.join()
+            server.close()
+
+
+class TestMysqldReadiness(unittest.TestCase):
+    def test_boot_timings(self):
+        with testing.mysqld.Mysqld(my_cnf={'skip-networking': None}) as mysqld:
+            self.assertTrue(mysqld.is_server_available())
+            self.assertIn('ready', mysqld.boot_timings)
+            self.assertGreater(mysqld.boot_timings['ready'], 0)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import testing.mysqld
+from contextlib import closing
+from testing.mysqld.replication import get_node_settings
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestNodeSettings(unittest.TestCase):
+    def test_get_node_settings(self):
+        settings = get_node_settings(2, 'mysql', (8, 0, 35))
+        self.assertEqual(2, settings['server-id'])
+        self.assertEqual('ON', settings['gtid_mode'])
+        self.assertEqual('ON', settings['log_replica_updates'])
+
+        settings = get_node_settings(1, 'mysql', (5, 7, 44))
+        self.assertIn('log-slave-updates', settings)
+
+        settings = get_node_settings(1, 'mariadb', (10, 11, 6))
+        self.assertNotIn('gtid_mode', settings)
+        self.assertEqual('mysql-bin', settings['log-bin'])
+
+
+class TestMysqldReplicaSet(unittest.TestCase):
+    def test_replication(self):
+        with testing.mysqld.MysqldReplicaSet(replicas=2) as replicaset:
+            self.assertEqual(3, len(replicaset.nodes))
+
+            with closing(pymysql.connect(**replicaset.primary.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("CREATE TABLE hello(id int PRIMARY KEY, value varchar(256))")
+                    cursor.execute("INSERT INTO hello values(1, 'hello'), (2, 'ciao')")
+                conn.commit()
+
+            replicaset.wait_for_replica_catchup()
+            for replica in replicaset.replicas:
+                with closing(pymysql.connect(**replica.dsn())) as conn:
+                    with closing(conn.cursor()) as cursor:
+                        cursor.execute('SELECT * FROM hello ORDER BY id')
+                        self.assertEqual(cursor.fetchall(), ((1, 'hello'), (2, 'ciao')))
+
+    def test_no_errant_transactions(self):
+        with testing.mysqld.MysqldReplicaSet(replicas=1) as replicaset:
+            replicaset.wait_for_replica_catchup()
+            if replicaset.flavor == 'mariadb':
+                statement = "SELECT @@GLOBAL.gtid_binlog_pos"
+            else:
+                statement = "SELECT @@GLOBAL.gtid_executed"
+
+            # replicas have no transactions of their own (except ones replicated from the primary)
+            executed = replicaset.query(replicaset.primary, statement)[0][0]
+            self.assertEqual(executed, replicaset.query(replicaset.replicas[0], statement)[0][0])
+
+    def test_replication_without_networking(self):
+        with self.assertRaises(ValueError):
+            testing.mysqld.MysqldReplicaSet(my_cnf={'skip-networking': None})
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import warnings
+import testing.mysqld
+from contextlib import closing
+from mock import Mock, patch
+from testing.mysqld.rollback import (
+    AUTOCOMMIT, IMPLICIT_COMMIT, SETS_AUTOCOMMIT, TEMPORARY_TABLE, TRANSACTION_CONTROL, ImplicitCommitWarning,
+    RollbackConnection
+)
+import pymysql
+import sqlalchemy
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestStatementDetection(unittest.TestCase):
+    def test_implicit_commit(self):
+        self.assertTrue(IMPLICIT_COMMIT.match("CREATE TABLE hello(id int)"))
+        self.assertTrue(IMPLICIT_COMMIT.match("  alter table hello add column value int"))
+        self.assertTrue(IMPLICIT_COMMIT.match("TRUNCATE hello"))
+        self.assertTrue(IMPLICIT_COMMIT.match("LOCK TABLES hello WRITE"))
+        self.assertFalse(IMPLICIT_COMMIT.match("INSERT INTO hello VALUES (1)"))
+        self.assertFalse(IMPLICIT_COMMIT.match("SELECT * FROM created"))
+
+        self.assertTrue(TEMPORARY_TABLE.match("CREATE TEMPORARY TABLE hello(id int)"))
+        self.assertFalse(TEMPORARY_TABLE.match("CREATE TABLE hello(id int)"))
+
+    def test_transaction_control(self):
+        self.assertTrue(TRANSACTION_CONTROL.match("BEGIN"))
+        self.assertTrue(TRANSACTION_CONTROL.match("start transaction"))
+        self.assertTrue(TRANSACTION_CONTROL.match("COMMIT WORK;"))
+        self.assertTrue(TRANSACTION_CONTROL.match("ROLLBACK"))
+        self.assertFalse(TRANSACTION_CONTROL.match("ROLLBACK TO SAVEPOINT sp1"))
+        self.assertTrue(TRANSACTION_CONTROL.match("COMMIT AND CHAIN"))
+        self.assertTrue(TRANSACTION_CONTROL.match("commit work and no chain no release"))
+        self.assertTrue(TRANSACTION_CONTROL.match("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"))
+        self.assertTrue(TRANSACTION_CONTROL.match("COMMIT RELEASE").group(2))
+
+        self.assertEqual('1', AUTOCOMMIT.match("SET autocommit=1").group(1))
+        self.assertEqual('ON', AUTOCOMMIT.match("set @@session.autocommit = ON;").group(1))
+        self.assertFalse(AUTOCOMMIT.match("SET autocommit=1, sql_mode=''"))
+        self.assertTrue(SETS_AUTOCOMMIT.match("SET autocommit=1, sql_mode=''"))
+
+
+class TestRollbackConnection(unittest.TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.connection = RollbackConnection(defer_connect=True)
+        self.connection.session = self.session
+        self.queries = []
+        patcher = patch('pymysql.connections.Connection.query',
+                        side_effect=lambda sql, unbuffered: self.queries.append(sql))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('pymysql.connections.Connection.autocommit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transaction_control(self):
+        self.connection.query("COMMIT AND CHAIN")
+        self.connection.query("SET autocommit=1")
+        self.connection.query("ROLLBACK WORK")
+        self.connection.query("SET autocommit=0")
+        self.assertEqual(['SAVEPOINT testing_mysqld_savepoint',
+                          'SAVEPOINT testing_mysqld_savepoint',
+                          'ROLLBACK TO SAVEPOINT testing_mysqld_savepoint',
+                          'SET autocommit=0'], self.queries)
+        self.assertFalse(self.session.implicit_commit.called)
+
+        with self.assertRaises(pymysql.err.NotSupportedError):
+            self.connection.query("COMMIT RELEASE")
+
+    def test_implicit_commit(self):
+        self.connection.query("INSERT INTO hello VALUES (1)")
+        self.assertFalse(self.session.implicit_commit.called)
+
+        self.connection.query("SET autocommit=1, sql_mode=''")
+        self.session.implicit_commit.assert_called_with("SET autocommit=1, sql_mode=''")
+
+        self.connection.query(b"TRUNCATE hello")
+        self.session.implicit_commit.assert_called_with("TRUNCATE hello")
+
+        # internal queries of the session are not inspected
+        with self.connection.unguarded():
+            self.connection.query("DROP DATABASE test")
+        self.assertEqual(2, self.session.implicit_commit.call_count)
+
+
+class TestRollbackSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+        with closing(pymysql.connect(**cls.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+                cursor.execute("INSERT INTO hello values(1, 'hello'), (2, 'ciao')")
+            conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+
+    def get_rows(self):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('SELECT * FROM hello ORDER BY id')
+                return cursor.fetchall()
+
+    def test_rollback(self):
+        with self.mysqld.rollback_session() as session:
+            with closing(session.connection.cursor()) as cursor:
+                cursor.execute("INSERT INTO hello values(3, 'hola')")
+                session.connection.commit()
+                cursor.execute("DELETE FROM hello WHERE id = 1")
+                session.connection.rollback()
+
+                cursor.execute('SELECT id FROM hello ORDER BY id')
+                self.assertEqual(((1,), (2,), (3,)), cursor.fetchall())
+
+            session.reset()
+            self.assertEqual({'rollback': 1, 'schema': 0}, session.resets)
+
+        self.assertEqual(((1, 'hello'), (2, 'ciao')), self.get_rows())
+
+    def test_implicit_commit(self):
+        with self.mysqld.rollback_session() as session:
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                with closing(session.connection.cursor()) as cursor:
+                    cursor.execute("INSERT INTO hello values(3, 'hola')")
+                    cursor.execute("CREATE TABLE world(id int)")
+                self.assertEqual(ImplicitCommitWarning, w[0].category)
+
+            self.assertEqual(["CREATE TABLE world(id int)"], session.fallbacks)
+            session.reset()
+            self.assertEqual({'rollback': 0, 'schema': 1}, session.resets)
+
+        self.assertEqual(((1, 'hello'), (2, 'ciao')), self.get_rows())
+
+    def test_create_engine(self):
+        with self.mysqld.rollback_session() as session:
+            engine = session.create_engine()
+            with engine.begin() as conn:
+                conn.execute(sqlalchemy.text("INSERT INTO hello values(3, 'hola')"))
+
+        self.assertEqual(((1, 'hello'), (2, 'ciao')), self.get_rows())
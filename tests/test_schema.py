@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import testing.mysqld
+from contextlib import closing
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestIsolatedDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+
+    def get_databases(self):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute('SHOW DATABASES')
+                return [row[0] for row in cursor.fetchall()]
+
+    def test_isolated_database(self):
+        with self.mysqld.isolated_database() as db1, self.mysqld.isolated_database() as db2:
+            self.assertNotEqual(db1.name, db2.name)
+            self.assertEqual(db1.name, db1.dsn()['db'])
+            self.assertIn('/%s?' % db1.name, db1.url())
+
+            with closing(pymysql.connect(**db1.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("CREATE TABLE hello(id int, value varchar(256))")
+
+            with closing(pymysql.connect(**db2.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("SHOW TABLES")
+                    self.assertEqual((), cursor.fetchall())
+
+        # dropped in background
+        self.mysqld.schema_dropper.join()
+        self.assertNotIn(db1.name, self.get_databases())
+        self.assertNotIn(db2.name, self.get_databases())
+
+    def test_isolated_database_with_template(self):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("CREATE TABLE template_hello(id int, value varchar(256))")
+                cursor.execute("INSERT INTO template_hello values(1, 'hello'), (2, 'ciao')")
+            conn.commit()
+
+        db = self.mysqld.isolated_database(template='test')
+        try:
+            with closing(pymysql.connect(**db.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute('SELECT * FROM template_hello ORDER BY id')
+                    self.assertEqual(cursor.fetchall(), ((1, 'hello'), (2, 'ciao')))
+        finally:
+            db.drop(wait=True)
+
+        self.assertNotIn(db.name, self.get_databases())
+
+    def test_isolated_database_with_template_objects(self):
+        with self.mysqld.isolated_database() as template:
+            with closing(pymysql.connect(**template.dsn())) as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("CREATE TABLE parent(id int PRIMARY KEY)")
+                    cursor.execute("CREATE TABLE child(id int PRIMARY KEY, parent_id int, "
+                                   "double_id int AS (id * 2), FOREIGN KEY (parent_id) REFERENCES parent(id))")
+                    cursor.execute("CREATE TABLE log(id int)")
+                    cursor.execute("CREATE VIEW children AS SELECT id, double_id FROM child")
+                    cursor.execute("CREATE TRIGGER logging AFTER INSERT ON child "
+                                   "FOR EACH ROW INSERT INTO log VALUES (NEW.id)")
+                    cursor.execute("INSERT INTO parent VALUES (1)")
+                    cursor.execute("INSERT INTO child (id, parent_id) VALUES (1, 1)")
+                conn.commit()
+
+            with self.mysqld.isolated_database(template=template.name) as db:
+                with closing(pymysql.connect(**db.dsn())) as conn:
+                    with closing(conn.cursor()) as cursor:
+                        cursor.execute('SELECT * FROM children')
+                        self.assertEqual(((1, 2),), cursor.fetchall())
+                        cursor.execute('SELECT * FROM log')
+                        self.assertEqual(((1,),), cursor.fetchall())  # not fired on copying
+
+                        cursor.execute("INSERT INTO child (id, parent_id) VALUES (2, 1)")
+                        cursor.execute('SELECT * FROM log ORDER BY id')
+                        self.assertEqual(((1,), (2,)), cursor.fetchall())
+
+                        with self.assertRaises(pymysql.err.IntegrityError):  # foreign key is kept
+                            cursor.execute("INSERT INTO child (id, parent_id) VALUES (3, 2)")
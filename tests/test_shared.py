@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import socket
+import tempfile
+import threading
+from mock import MagicMock
+from shutil import rmtree
+from time import sleep
+from contextlib import closing
+from testing.mysqld.shared import Broker, SharedMysqld, lock, read_state
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestBroker(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.mysqld = MagicMock()
+        self.mysqld.dsn.return_value = dict(unix_socket='/tmp/mysql.sock', user='root', db='test')
+
+    def tearDown(self):
+        rmtree(self.directory)
+
+    def start_broker(self, idle_timeout=60):
+        broker = Broker(self.directory, idle_timeout=idle_timeout, mysqld=self.mysqld)
+        thread = threading.Thread(target=broker.run)
+        thread.daemon = True
+        thread.start()
+        for _ in range(100):
+            if read_state(self.directory):
+                break
+            sleep(0.01)
+        return broker, thread
+
+    def test_lease(self):
+        broker, thread = self.start_broker(idle_timeout=0.1)
+        with SharedMysqld(directory=self.directory) as shared1, SharedMysqld(directory=self.directory) as shared2:
+            self.assertEqual(shared1.broker_pid, shared2.broker_pid)
+            self.assertEqual('/tmp/mysql.sock', shared1.dsn()['unix_socket'])
+
+            db1 = shared1.lease()
+            db2 = shared2.lease(prefix='myapp_')
+            self.assertNotEqual(db1.name, db2.name)
+            self.assertTrue(db2.name.startswith('myapp_'))
+            self.assertEqual(db1.name, db1.dsn()['db'])
+            self.assertIn('/%s?' % db1.name, db1.url())
+
+            db1.release()
+            self.mysqld.schema_dropper.put.assert_called_with(db1.name)
+
+            with self.assertRaises(RuntimeError):
+                shared1.request(op='unknown')
+
+        # schemas leased by disconnected clients are dropped, then the broker stops
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.mysqld.schema_dropper.put.assert_called_with(db2.name)
+        self.assertTrue(self.mysqld.stop.called)
+        self.assertIsNone(read_state(self.directory))
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(os.path.join(self.directory, 'broker.sock'))
+        return sock
+
+    def test_malformed_request(self):
+        broker, thread = self.start_broker(idle_timeout=0.1)
+        with SharedMysqld(directory=self.directory) as shared:
+            with closing(self.connect()) as sock:
+                sock.sendall(b'not json\n')
+                self.assertEqual(b'', sock.recv(4096))  # disconnected by the broker
+
+            # other clients are still served
+            self.assertTrue(thread.is_alive())
+            self.assertFalse(self.mysqld.stop.called)
+            db = shared.lease()
+            db.release()
+
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(1, self.mysqld.stop.call_count)
+
+    def test_abrupt_disconnect(self):
+        broker, thread = self.start_broker(idle_timeout=0.1)
+        with SharedMysqld(directory=self.directory) as shared:
+            for _ in range(10):
+                sock = self.connect()
+                sock.sendall(b'{"op": "lease"}\n')
+                sock.close()  # before the response arrives
+
+            for _ in range(100):
+                if len(broker.clients) == 1:
+                    break
+                sleep(0.01)
+
+            self.assertEqual(1, len(broker.clients))
+            self.assertTrue(thread.is_alive())
+            self.assertFalse(self.mysqld.stop.called)
+            shared.lease().release()
+
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(1, self.mysqld.stop.call_count)
+
+    def test_attach_while_idle(self):
+        broker, thread = self.start_broker(idle_timeout=0.1)
+        with lock(self.directory):  # a client is attaching
+            sleep(1.5)  # the broker tries to shut down meanwhile
+            with closing(self.connect()) as sock:
+                sock.settimeout(5)
+                sock.sendall(b'{"op": "hello"}\n')
+                self.assertIn(b'"pid"', sock.recv(4096))
+
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_stale_state(self):
+        broker, thread = self.start_broker(idle_timeout=0)
+        thread.join(5)
+
+        with open(os.path.join(self.directory, 'state.json'), 'w') as fd:
+            fd.write('{"pid": 0, "socket": "%s/broker.sock"}' % self.directory)
+
+        shared = SharedMysqld.__new__(SharedMysqld)
+        shared.directory = self.directory
+        shared.lock = threading.Lock()
+        shared.sock = shared.reader = None
+        self.assertFalse(shared.attach())
+
+
+class TestSharedMysqld(unittest.TestCase):
+    def test_shared_mysqld(self):
+        directory = tempfile.mkdtemp()
+        try:
+            shared1 = SharedMysqld(directory=directory, idle_timeout=1, my_cnf={'skip-networking': None})
+            shared2 = SharedMysqld(directory=directory, idle_timeout=1)
+            self.assertEqual(shared1.broker_pid, shared2.broker_pid)
+
+            with shared1.lease() as db:
+                with closing(pymysql.connect(**db.dsn())) as conn:
+                    with closing(conn.cursor()) as cursor:
+                        cursor.execute('SELECT DATABASE()')
+                        self.assertEqual((db.name,), cursor.fetchone())
+
+            shared1.close()
+            shared2.close()
+            for _ in range(100):
+                if read_state(directory) is None:
+                    break
+                sleep(0.1)
+            self.assertIsNone(read_state(directory))
+        finally:
+            rmtree(directory)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import testing.mysqld
+from mock import Mock
+from shutil import rmtree
+from contextlib import closing
+from testing.mysqld.snapshot import SnapshotManager
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestSnapshotManager(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.base_dir, 'var')
+        os.makedirs(os.path.join(self.data_dir, 'test'))
+        self.write('test/hello.ibd', 'hello')
+
+        self.mysqld = Mock(base_dir=self.base_dir, _ephemeral_dir=None, child_process=None, read_only=False,
+                           settings={'clone_strategies': None}, _rollback_templates=set())
+        self.mysqld.get_data_directory.return_value = self.data_dir
+
+    def tearDown(self):
+        rmtree(self.base_dir)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.data_dir, filename), 'w') as fd:
+            fd.write(content)
+
+    def read(self, filename):
+        with open(os.path.join(self.data_dir, filename)) as fd:
+            return fd.read()
+
+    def test_take_and_restore(self):
+        manager = SnapshotManager(self.mysqld)
+        self.mysqld._rollback_templates.add('_pristine_test')
+        snapshot = manager.take('initial')
+        self.assertEqual('initial', snapshot.name)
+        self.assertEqual(5, snapshot.size)
+        self.assertEqual(os.path.join(self.base_dir, 'snapshots', 'initial'), snapshot.path)
+
+        self.write('test/hello.ibd', 'modified')
+        self.write('test/world.ibd', 'world')
+        self.mysqld._rollback_templates = set()
+
+        result = manager.restore('initial')
+        self.assertIs(snapshot, result.snapshot)
+        self.assertGreaterEqual(result.elapsed, 0)
+        self.assertEqual('hello', self.read('test/hello.ibd'))
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, 'test', 'world.ibd')))
+        self.assertEqual(set(['_pristine_test']), self.mysqld._rollback_templates)
+
+        # snapshot is not changed by modifications after restore
+        self.write('test/world.ibd', 'world')
+        manager.restore('initial')
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, 'test', 'world.ibd')))
+
+    def test_restart(self):
+        manager = SnapshotManager(self.mysqld)
+        self.mysqld.child_process = Mock()
+        manager.take('initial')
+        self.assertEqual(1, self.mysqld.terminate.call_count)
+        self.assertEqual(1, self.mysqld.start.call_count)
+
+        self.mysqld.child_process = None
+        manager.restore('initial')
+        self.assertEqual(1, self.mysqld.terminate.call_count)
+        self.assertEqual(1, self.mysqld.start.call_count)
+
+    def test_errors(self):
+        manager = SnapshotManager(self.mysqld)
+        with self.assertRaises(ValueError):
+            manager.take('../invalid')
+        with self.assertRaises(KeyError):
+            manager.restore('unknown')
+
+    def test_remove(self):
+        manager = SnapshotManager(self.mysqld)
+        snapshot = manager.take('initial')
+        manager.remove('initial')
+        self.assertFalse(os.path.exists(snapshot.path))
+        with self.assertRaises(KeyError):
+            manager.restore('initial')
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+
+    def execute(self, *statements):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+                conn.commit()
+                return cursor.fetchall()
+
+    def test_snapshot_and_restore(self):
+        self.execute("CREATE TABLE snapshot_hello(id int, value varchar(256))",
+                     "INSERT INTO snapshot_hello values(1, 'hello')")
+        snapshot = self.mysqld.snapshot('hello')
+        self.assertGreater(snapshot.size, 0)
+        self.assertTrue(self.mysqld.is_alive())
+
+        self.execute("INSERT INTO snapshot_hello values(2, 'ciao')",
+                     "CREATE TABLE snapshot_world(id int)")
+        result = self.mysqld.restore('hello')
+        self.assertGreater(result.elapsed, 0)
+        self.assertTrue(self.mysqld.is_alive())
+        self.assertEqual(((1, 'hello'),), self.execute("SELECT * FROM snapshot_hello"))
+        self.assertEqual((('snapshot_hello',),), self.execute("SHOW TABLES LIKE 'snapshot_%'"))
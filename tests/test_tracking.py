@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import testing.mysqld
+from mock import Mock
+from contextlib import closing
+from testing.mysqld.tracking import ChecksumTracker, StatisticsTracker, TableResetter, get_tracker
+import pymysql
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+
+class TestTrackers(unittest.TestCase):
+    def test_checksum_tracker(self):
+        cursor = Mock()
+        cursor.fetchall.side_effect = [[('hello',), ('world',)],
+                                       [('test.hello', 123), ('test.world', None)]]
+        self.assertEqual({'hello': 123}, ChecksumTracker().get_signatures(cursor, 'test'))
+        cursor.execute.assert_called_with('CHECKSUM TABLE `test`.`hello`, `test`.`world`')
+
+        cursor = Mock()
+        self.assertEqual({}, ChecksumTracker().get_signatures(cursor, 'test', []))
+        self.assertFalse(cursor.execute.called)
+
+    def test_statistics_tracker(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('hello', 1, 2, 3), ('world', 4, 5, 6)]
+        self.assertEqual({'hello': (1, 2, 3)}, StatisticsTracker().get_signatures(cursor, 'test', ['hello']))
+        self.assertIn('performance_schema', cursor.execute.call_args[0][0])
+
+        StatisticsTracker(use_performance_schema=False).get_signatures(cursor, 'test')
+        self.assertNotIn('performance_schema', cursor.execute.call_args[0][0])
+
+    def test_get_tracker(self):
+        cursor = Mock()
+        cursor.fetchone.return_value = (1,)
+        self.assertIsInstance(get_tracker(cursor, 'auto'), StatisticsTracker)
+        self.assertIsInstance(get_tracker(cursor, 'checksum'), ChecksumTracker)
+
+        cursor.fetchone.return_value = (0,)
+        self.assertIsInstance(get_tracker(cursor, 'auto'), ChecksumTracker)
+
+        cursor.execute.side_effect = pymysql.err.OperationalError
+        self.assertIsInstance(get_tracker(cursor, 'auto'), ChecksumTracker)
+
+        with self.assertRaises(ValueError):
+            get_tracker(cursor, 'unknown')
+
+    def test_changed_tables(self):
+        resetter = TableResetter(Mock(), 'test')
+        with self.assertRaises(RuntimeError):
+            resetter.changed_tables()
+
+        resetter.signatures = {'hello': 1, 'world': 2, 'dropped': 3}
+        resetter.tracker = Mock()
+        resetter.tracker.get_signatures.return_value = {'hello': 1, 'world': 5, 'created': 6}
+        self.assertEqual(['created', 'dropped', 'world'], resetter.changed_tables())
+
+
+class TestTableResetter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mysqld = testing.mysqld.Mysqld(my_cnf={'skip-networking': None})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mysqld.stop()
+
+    def execute(self, *statements):
+        with closing(pymysql.connect(**self.mysqld.dsn())) as conn:
+            with closing(conn.cursor()) as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+                conn.commit()
+                return cursor.fetchall()
+
+    def test_reset_tables(self):
+        for tracking in ('statistics', 'checksum'):
+            self.execute("DROP TABLE IF EXISTS orders, users, extra",
+                         "CREATE TABLE users(id int PRIMARY KEY, name varchar(256))",
+                         "CREATE TABLE orders(id int PRIMARY KEY, user_id int, "
+                         "FOREIGN KEY (user_id) REFERENCES users(id))",
+                         "INSERT INTO users VALUES(1, 'alice'), (2, 'bob')")
+            self.mysqld.checkpoint(tracking=tracking)
+            self.assertEqual([], self.mysqld.reset_tables().tables)
+
+            self.execute("INSERT INTO orders VALUES(1, 1)",
+                         "CREATE TABLE extra(id int)")
+            result = self.mysqld.reset_tables()
+            self.assertEqual(['extra', 'orders'], result.tables)
+            self.assertEqual((), self.execute("SELECT * FROM orders"))
+            self.assertEqual((), self.execute("SHOW TABLES LIKE 'extra'"))
+            self.assertEqual(((1, 'alice'), (2, 'bob')), self.execute("SELECT * FROM users ORDER BY id"))
+
+            # dropped and altered tables are restored with foreign keys
+            self.execute("SET foreign_key_checks = 0", "DROP TABLE users",
+                         "ALTER TABLE orders ADD COLUMN note text")
+            self.mysqld.reset_tables()
+            self.assertEqual(((1, 'alice'), (2, 'bob')), self.execute("SELECT * FROM users ORDER BY id"))
+            self.assertIn('FOREIGN KEY', self.execute("SHOW CREATE TABLE orders")[0][1])
+            self.assertNotIn('note', self.execute("SHOW CREATE TABLE orders")[0][1])
+
+    def test_no_checkpoint(self):
+        with self.assertRaises(RuntimeError):
+            self.mysqld.reset_tables(db='unknown')